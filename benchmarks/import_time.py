@@ -0,0 +1,49 @@
+"""Benchmark of the time to import backlight modules in a fresh interpreter.
+
+Usage:
+    PYTHONPATH=src python benchmarks/import_time.py
+"""
+import statistics
+import subprocess
+import sys
+
+MODULES = [
+    "backlight",
+    "backlight.query",
+    "backlight.query.adapters.csv",
+    "backlight.query.adapters.csv_glob",
+]
+
+REPEAT = 5
+
+_SCRIPT = """
+import sys
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start, "boto3" in sys.modules)
+"""
+
+
+def _import_time(module: str) -> tuple:
+    output = subprocess.check_output(
+        [sys.executable, "-c", _SCRIPT.format(module=module)]
+    )
+    seconds, boto3 = output.decode().split()
+    return float(seconds), boto3 == "True"
+
+
+def main() -> None:
+    print("{:<36} {:>10} {:>10} {:>6}".format("module", "min", "median", "boto3"))
+    for module in MODULES:
+        results = [_import_time(module) for _ in range(REPEAT)]
+        seconds = [s for s, _ in results]
+        print(
+            "{:<36} {:>9.3f}s {:>9.3f}s {:>6}".format(
+                module, min(seconds), statistics.median(seconds), str(results[0][1])
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
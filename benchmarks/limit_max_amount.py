@@ -0,0 +1,48 @@
+"""Benchmark of `backlight.strategies.filter.limit_max_amount`.
+
+Usage:
+    PYTHONPATH=src python benchmarks/limit_max_amount.py
+"""
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from backlight.asset.currency import Currency
+from backlight.strategies.filter import _limit_max_amount_by_iterrows, limit_max_amount
+from backlight.trades.trades import Trades, from_arrays
+
+
+def _make_trades(size: int) -> Trades:
+    """Trades of `size` rows, each trade has an entry and an exit."""
+    n_trades = size // 2
+    entries = pd.date_range(start="2018-06-06", freq="1min", periods=n_trades)
+    holdings = pd.to_timedelta(np.random.randint(1, 60, n_trades), unit="m")
+    amounts = np.random.choice([-1.0, 1.0], n_trades)
+    return from_arrays(
+        entries.append(entries + holdings),
+        np.concatenate([amounts, -amounts]),
+        np.tile(np.arange(n_trades), 2),
+        "USDJPY",
+        Currency.JPY,
+    )
+
+
+def main() -> None:
+    np.random.seed(0)
+    max_amount = 10
+    print("{:>10} {:>12} {:>12}".format("rows", "vectorized", "iterrows"))
+    for size in [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]:
+        trades = _make_trades(size)
+        elapsed = timeit.timeit(lambda: limit_max_amount(trades, max_amount), number=1)
+        if size <= 10 ** 4:
+            reference = timeit.timeit(
+                lambda: _limit_max_amount_by_iterrows(trades, max_amount), number=1
+            )
+            print("{:>10} {:>11.3f}s {:>11.3f}s".format(size, elapsed, reference))
+        else:
+            print("{:>10} {:>11.3f}s {:>12}".format(size, elapsed, "-"))
+
+
+if __name__ == "__main__":
+    main()
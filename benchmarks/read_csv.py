@@ -0,0 +1,50 @@
+"""Benchmark of `backlight.query.adapters.csv.read_csv_and_set_index` with and
+without the options of its fast path.
+
+Usage:
+    PYTHONPATH=src python benchmarks/read_csv.py
+"""
+import os
+import tempfile
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from backlight.query.adapters.csv import CSVOptions, read_csv_and_set_index
+
+OPTIONS = [
+    ("default", None),
+    ("c", CSVOptions(engine="c")),
+    ("c, float32", CSVOptions(dtype="float32", engine="c")),
+    ("pyarrow", CSVOptions(engine="pyarrow")),
+    ("pyarrow, float32", CSVOptions(dtype="float32", engine="pyarrow")),
+]
+
+
+def main() -> None:
+    np.random.seed(0)
+    size = 10 ** 6
+    df = pd.DataFrame(
+        index=pd.date_range(start="2018-06-06", freq="1s", periods=size),
+        data={"ask": np.random.rand(size) + 100, "bid": np.random.rand(size) + 100},
+    )
+    df.index.name = "timestamp"
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "ticks.csv")
+        df.to_csv(path)
+        print("{:>18} {:>10}".format("options", "seconds"))
+        for name, options in OPTIONS:
+            try:
+                elapsed = timeit.timeit(
+                    lambda: read_csv_and_set_index(path, options), number=1
+                )
+            except ImportError:
+                print("{:>18} {:>10}".format(name, "-"))
+                continue
+            print("{:>18} {:>9.3f}s".format(name, elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -36,6 +36,7 @@ setuptools.setup(
         "matplotlib>=2.2.2",
         "boto3>=1.9.36",
     ],
+    extras_require={"rds": ["sqlalchemy>=1.4"]},
     tests_require=[
         "pytest-cov>=2.5.1",
         "pytest-mock>=1.7.1",
@@ -0,0 +1,5 @@
+from backlight.alignment.alignment import (  # noqa
+    is_contained,
+    set_trusted_inputs,
+    trusted_inputs,
+)
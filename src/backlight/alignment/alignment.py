@@ -0,0 +1,87 @@
+import weakref
+import numpy as np
+import pandas as pd
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, Tuple
+
+
+# Results of `is_contained` keyed by the identities of the two indices. The
+# indices are immutable, so an entry stays valid as long as both are alive.
+_CACHE_SIZE = 128
+_cache = OrderedDict()  # type: OrderedDict
+
+_trusted = False
+
+
+def set_trusted_inputs(trusted: bool) -> None:
+    """Skip alignment validations, e.g. for production sweeps over inputs which
+    are known to be aligned.
+
+    Args:
+        trusted: If True, `is_contained` always returns True.
+    """
+    global _trusted
+    _trusted = trusted
+
+
+@contextmanager
+def trusted_inputs(trusted: bool = True) -> Iterator[None]:
+    """Context manager version of `set_trusted_inputs`."""
+    previous = _trusted
+    set_trusted_inputs(trusted)
+    try:
+        yield
+    finally:
+        set_trusted_inputs(previous)
+
+
+def _values(sub: pd.Index, index: pd.Index) -> Tuple[np.ndarray, np.ndarray]:
+    if isinstance(sub, pd.DatetimeIndex) and isinstance(index, pd.DatetimeIndex):
+        return sub.asi8, index.asi8
+    return sub.values, index.values
+
+
+def _is_contained(sub: pd.Index, index: pd.Index) -> bool:
+    if len(sub) == 0:
+        return True
+    if len(index) == 0:
+        return False
+    if not (sub.is_monotonic_increasing and index.is_monotonic_increasing):
+        return bool(sub.isin(index).all())
+
+    sub_values, values = _values(sub, index)
+    positions = np.minimum(values.searchsorted(sub_values), len(values) - 1)
+    return bool((values[positions] == sub_values).all())
+
+
+def is_contained(sub: pd.Index, index: pd.Index) -> bool:
+    """Check that all the labels of `sub` are in `index`.
+
+    Sorted indices are merged with a binary search instead of hashing, and the
+    result is cached for the pair of index objects.
+
+    Args:
+        sub: Index to be checked, e.g. the index of a signal.
+        index: Index expected to contain `sub`, e.g. the index of market data.
+
+    Returns:
+        True if `sub` is contained, or if inputs are trusted.
+    """
+    if _trusted:
+        return True
+
+    key = (id(sub), id(index))
+    cached = _cache.get(key)
+    if cached is not None:
+        sub_ref, index_ref, result = cached
+        if sub_ref() is sub and index_ref() is index:
+            _cache.move_to_end(key)
+            return result
+
+    result = _is_contained(sub, index)
+    _cache[key] = (weakref.ref(sub), weakref.ref(index), result)
+    if len(_cache) > _CACHE_SIZE:
+        _cache.popitem(last=False)
+    return result
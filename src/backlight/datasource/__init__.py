@@ -1,5 +1,6 @@
-from backlight.datasource.utils import (
+from backlight.datasource.utils import (  # noqa
     load_marketdata,
+    iter_marketdata,
     from_dataframe,
     mid2askbid,
-)  # noqa
+)
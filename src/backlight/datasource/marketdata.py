@@ -1,12 +1,71 @@
+import weakref
+import numpy as np
 import pandas as pd
-from typing import Type
+from typing import Any, Callable, List, Optional, Type
 from backlight.asset.currency import Currency
 
 
+class _DerivedColumns(dict):
+    """Derived columns by name, as tuples of weak references to the source
+    arrays and the derived array. Emptied by pickling since the references
+    can not be restored."""
+
+    def __reduce__(self) -> tuple:
+        return (_DerivedColumns, ())
+
+
 class MarketData(pd.DataFrame):
     """MarketData container which inherits pd.DataFrame."""
 
-    _metadata = ["symbol", "_target_columns", "currency_unit"]
+    _metadata = ["symbol", "_target_columns", "currency_unit", "_derived"]
+
+    # Shared with the frames derived by `_constructor`, so entries are checked
+    # against the source arrays and the dict is replaced instead of mutated.
+    _derived = None  # type: Optional[_DerivedColumns]
+
+    def _clear_item_cache(self, *args: Any, **kwargs: Any) -> None:
+        self._derived = None
+        super()._clear_item_cache(*args, **kwargs)
+
+    def _set_value(self, *args: Any, **kwargs: Any) -> Any:
+        self._derived = None
+        return super()._set_value(*args, **kwargs)
+
+    def _maybe_cache_changed(self, *args: Any, **kwargs: Any) -> None:
+        # Called back on in-place writes to a column through its Series, e.g.
+        # `m["ask"][ts] = v`, which keep the same array.
+        self._derived = None
+        super()._maybe_cache_changed(*args, **kwargs)
+
+    def _derive(
+        self, name: str, columns: List[str], func: Callable[..., np.ndarray]
+    ) -> pd.Series:
+        """Column computed by `func` out of `columns`, cached until they change.
+
+        Writes through the DataFrame or the Series of a column invalidate the
+        cache, writes to the arrays of `.values` do not.
+
+        Args:
+            name: Name of the derived column for caching.
+            columns: Columns to pass to `func` as arrays.
+            func: Function computing the derived column.
+        Returns:
+            pd.Series of float64 sharing the cached array, not to be modified.
+        """
+        arrays = [self[c].values for c in columns]
+        derived = self._derived if self._derived is not None else _DerivedColumns()
+
+        cached = derived.get(name)
+        if cached is not None:
+            refs, values = cached
+            if all(r() is a for r, a in zip(refs, arrays)):
+                return pd.Series(data=values, index=self.index)
+
+        values = np.ascontiguousarray(func(*arrays), dtype=np.float64)
+        derived = _DerivedColumns(derived)
+        derived[name] = (tuple(weakref.ref(a) for a in arrays), values)
+        self._derived = derived
+        return pd.Series(data=values, index=self.index)
 
     def reset_cols(self) -> None:
         for col in self.columns:
@@ -35,6 +94,16 @@ class ForexMarketData(MarketData):
     def base_currency(self) -> Currency:
         return self.currency_unit
 
+    def fees(self, trade_amounts: List[pd.Series]) -> List[pd.Series]:
+        """Calculate trading fees of many trade amounts at once.
+
+        Args:
+            trade_amounts: Trade amounts, indexed by timestamps of this market.
+        Returns:
+            Fees of each of `trade_amounts`.
+        """
+        return [self.fee(a) for a in trade_amounts]
+
     @property
     def _constructor(self) -> Type["ForexMarketData"]:
         return ForexMarketData
@@ -67,25 +136,53 @@ class AskBidMarketData(ForexMarketData):
     @property
     def mid(self) -> pd.Series:
         """Mid price"""
-        return (self.ask + self.bid) / 2.0
+        return self._derive("mid", ["ask", "bid"], lambda a, b: (a + b) / 2.0)
 
     @property
     def spread(self) -> pd.Series:
         """Spread"""
-        return (self.ask - self.bid).abs()
+        return self._derive("spread", ["ask", "bid"], lambda a, b: np.abs(a - b))
+
+    def _rows(self, index: pd.Index) -> np.ndarray:
+        rows = self.index.get_indexer(index)
+        if (rows < 0).any():
+            raise KeyError("{} not in index".format(list(index[rows < 0])))
+        return rows
+
+    def _fee(self, rows: np.ndarray, amount: np.ndarray) -> np.ndarray:
+        ask = self["ask"].values[rows]
+        bid = self["bid"].values[rows]
+        with np.errstate(invalid="ignore"):  # NaN amounts have no price
+            price = np.where(amount > 0.0, ask, np.where(amount < 0.0, bid, 0.0))
+        return price * amount
 
     def fee(self, trade_amount: pd.Series) -> pd.Series:
         """Calculate trading fee when trading on ask/bid prices."""
-        fee = pd.Series(data=0.0, index=trade_amount.index)
-
-        # TODO: avoid long codes
-        fee.loc[trade_amount > 0.0] = self.loc[
-            pd.Series(data=False, index=self.index) | (trade_amount > 0.0), "ask"
-        ]
-        fee.loc[trade_amount < 0.0] = self.loc[
-            pd.Series(data=False, index=self.index) | (trade_amount < 0.0), "bid"
+        rows = self._rows(trade_amount.index)
+        return pd.Series(
+            data=self._fee(rows, trade_amount.values), index=trade_amount.index
+        )
+
+    def fees(self, trade_amounts: List[pd.Series]) -> List[pd.Series]:
+        """Calculate trading fees of many trade amounts at once.
+
+        Args:
+            trade_amounts: Trade amounts, indexed by timestamps of this market.
+        Returns:
+            Fees of each of `trade_amounts`.
+        """
+        if len(trade_amounts) == 0:
+            return []
+
+        index = trade_amounts[0].index.append([a.index for a in trade_amounts[1:]])
+        amount = np.concatenate([a.values for a in trade_amounts])
+        fee = self._fee(self._rows(index), amount)
+
+        offsets = np.cumsum([len(a) for a in trade_amounts])[:-1]
+        return [
+            pd.Series(data=f, index=a.index)
+            for f, a in zip(np.split(fee, offsets), trade_amounts)
         ]
-        return fee * trade_amount
 
     @property
     def _constructor(self) -> Type["AskBidMarketData"]:
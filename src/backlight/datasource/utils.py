@@ -1,5 +1,5 @@
 import pandas as pd
-from typing import Optional, List
+from typing import Iterator, Optional, List
 
 from backlight.datasource.marketdata import (
     MarketData,
@@ -7,7 +7,8 @@ from backlight.datasource.marketdata import (
     AskBidMarketData,
     ForexMarketData,
 )
-from backlight.query import query
+from backlight.query import query, iter_query
+from backlight.query.adapter import DEFAULT_CHUNKSIZE
 from backlight.asset.currency import Currency
 
 
@@ -36,6 +37,33 @@ def load_marketdata(
     )
 
 
+def iter_marketdata(
+    symbol: str,
+    start_dt: pd.Timestamp,
+    end_dt: pd.Timestamp,
+    url: str,
+    currency_unit: Currency,
+    quote_currency: Optional[Currency] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> Iterator[MarketData]:
+    """Load the market data by chunks, for ranges too large to fit in memory.
+
+    Args:
+        symbol :  A symbol to query
+        start_dt :  Date to query from
+        end_dt :  Date to query to
+        url :  An url to the data source
+        chunksize :  Maximum number of rows of each chunk
+
+    Returns:
+        An iterator of MarketData, one per chunk
+    """
+    for df in iter_query(symbol, start_dt, end_dt, url, chunksize=chunksize):
+        yield from_dataframe(
+            df, symbol, currency_unit, col_mapping=None, quote_currency=quote_currency
+        )
+
+
 def from_dataframe(
     df: pd.DataFrame,
     symbol: str,
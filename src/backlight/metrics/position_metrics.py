@@ -61,7 +61,7 @@ def calculate_position_performance(
         ]
     ).set_index(0)
 
-    del m.index.name
+    m.index.name = None
     m.columns = ["metrics"]
 
     return m.T
@@ -41,9 +41,9 @@ def count_trades(trades: Trades, mkt: MarketData) -> Tuple[int, int, int]:
         total count, win count, lose count
     """
     pls = [
-        _calculate_pl(trades.get_trade(i), mkt)
-        for i in trades.ids
-        if len(trades.get_trade(i).index) > 1
+        _calculate_pl(trade, mkt)
+        for _, trade in trades.iter_trades()
+        if len(trade.index) > 1
     ]
     total = len(trades.ids)
     win = sum([pl > 0.0 for pl in pls])
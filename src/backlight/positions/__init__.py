@@ -1 +1,2 @@
 from backlight.positions.positions import calculate_positions  # noqa
+from backlight.positions.positions import IncrementalPositions  # noqa
@@ -1,7 +1,8 @@
 import pandas as pd
 import numpy as np
-from typing import Type, Callable
+from typing import Any, Optional, Tuple, Type
 
+from backlight.alignment import is_contained
 from backlight.datasource.marketdata import MarketData, MidMarketData, AskBidMarketData
 from backlight.trades.trades import Trades
 from backlight.asset.currency import Currency
@@ -44,28 +45,155 @@ class Positions(pd.DataFrame):
         return Positions
 
 
-def _pricer(trades: Trades, mkt: MarketData, principal: float) -> pd.DataFrame:
-    trade = trades.amount
+def _cumsum(values: np.ndarray, initial: float) -> Tuple[np.ndarray, float]:
+    """Cumulative sums from `initial` which skip NaNs as `pd.Series.cumsum` does.
+
+    Returns:
+        The sums, and the total to continue from.
+    """
+    sums = np.nancumsum(np.append(initial, values))
+    total = float(sums[-1])
+    sums = sums[1:]
+    sums[np.isnan(values)] = np.nan
+    return sums, total
+
+
+def _ffill(values: np.ndarray, initial: float) -> np.ndarray:
+    """Forward fill NaNs, with `initial` as the value before the first element."""
+    rows = np.where(np.isnan(values), -1, np.arange(len(values)))
+    np.maximum.accumulate(rows, out=rows)
+    return np.where(rows >= 0, values[rows], initial)
+
 
-    # historical data
-    idx = mkt.index[trade.index[0] <= mkt.index]  # only after first trades
-    fee = mkt.fee(trade)
-    positions = pd.DataFrame(
-        index=idx,
-        data={
-            "amount": trade.cumsum(),
-            "price": mkt.mid.loc[idx],
-            "principal": -fee.cumsum() + principal,
-        },
-        columns=["amount", "price", "principal"],
-    )
-    positions = positions.ffill()
+class IncrementalPositions:
+    """Positions which can be extended bar by bar, e.g. to follow live PnL.
+
+    Rows are written into a preallocated buffer whose first row is reserved for
+    the initial position, so that `update` never recomputes the history.
+    """
+
+    _columns = ["amount", "price", "principal"]
+
+    def __init__(self, principal: float = 0.0, capacity: int = 1024) -> None:
+        """
+        Args:
+            principal: The initial principal value.
+            capacity: Number of bars to allocate at first. Grown when exceeded.
+        """
+        self.principal = principal
+        self.symbol = None  # type: Optional[str]
+        self.currency_unit = None  # type: Optional[Currency]
+
+        self._values = np.empty((capacity + 1, 3))
+        self._values[0] = [0.0, 0.0, principal]
+        self._timestamps = np.empty(capacity + 1, dtype=np.int64)
+        self._size = 1
+
+        self._tz = None  # type: Any
+        self._index_name = None  # type: Any
+        self._freq = None  # type: Optional[pd.Timedelta]
+
+        # Running sums of amounts and fees, and the last row to forward fill from.
+        self._amount = 0.0
+        self._fee = 0.0
+        self._last = np.full(3, np.nan)
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self._values)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        values = np.empty((capacity, 3))
+        values[: self._size] = self._values[: self._size]
+        timestamps = np.empty(capacity, dtype=np.int64)
+        timestamps[: self._size] = self._timestamps[: self._size]
+        self._values, self._timestamps = values, timestamps
+
+    def update(self, new_bars: MarketData, new_trades: Trades) -> None:
+        """Extend the positions.
+
+        Args:
+            new_bars: Market data following the bars given so far.
+            new_trades: Trades on `new_bars`.
+        """
+        assert new_trades.symbol == new_bars.symbol
+        assert new_trades.currency_unit == new_bars.currency_unit
+        assert is_contained(new_trades.index, new_bars.index)
+        if self.symbol is None:
+            self.symbol = new_trades.symbol
+            self.currency_unit = new_trades.currency_unit
+        assert self.symbol == new_trades.symbol
+        assert self.currency_unit == new_trades.currency_unit
+        if len(new_bars) == 0:
+            return
+
+        trade = new_trades.amount
+        idx = new_bars.index
+        is_started = self._size > 1
+        if is_started:
+            assert idx.asi8[0] > self._timestamps[self._size - 1]
+            is_bar = np.ones(len(idx), dtype=bool)
+        elif len(trade) == 0:
+            return  # Positions start from the first trade.
+        else:
+            is_bar = trade.index[0] <= idx
+            idx = idx[is_bar]
+            self._tz = idx.tz
+            self._index_name = idx.name
+            self._freq = idx.freq
+
+        fee = new_bars.fee(trade).reindex(trade.index).values
+        amounts, self._amount = _cumsum(trade.values, self._amount)
+        fees, self._fee = _cumsum(fee, self._fee)
+
+        rows = idx.get_indexer(trade.index)
+        is_found = rows >= 0
+        size = len(idx)
+        values = np.full((size, 3), np.nan)
+        values[rows[is_found], 0] = amounts[is_found]
+        values[:, 1] = new_bars.mid.values[is_bar]
+        values[rows[is_found], 2] = -fees[is_found] + self.principal
+        for i in range(3):
+            values[:, i] = _ffill(values[:, i], self._last[i])
+        if size > 0:
+            self._last = values[-1].copy()
+
+        self._reserve(self._size + size)
+        self._values[self._size : self._size + size] = values
+        self._timestamps[self._size : self._size + size] = idx.asi8
+        self._size += size
+
+    def _frame(self) -> pd.DataFrame:
+        if self._size == 1:
+            return pd.DataFrame(columns=self._columns, dtype=float)
+
+        idx = pd.DatetimeIndex(self._timestamps[1 : self._size].view("datetime64[ns]"))
+        if self._tz is not None:
+            idx = idx.tz_localize("UTC").tz_convert(self._tz)
+        freq = self._freq if self._freq is not None else _freq(idx)
+        frame = pd.DataFrame(
+            data=self._values[: self._size].copy(),
+            index=idx.insert(0, idx[0] - freq).rename(self._index_name),
+            columns=self._columns,
+        )
+        if not frame.index.is_monotonic_increasing:
+            frame = frame.sort_index()
+        return frame
+
+    @property
+    def positions(self) -> Positions:
+        """Positions so far."""
+        pos = Positions(self._frame())
+        pos.symbol = self.symbol
+        pos.currency_unit = self.currency_unit
+        return pos
 
-    # add initial data
-    initial_idx = idx[0] - _freq(idx)
-    positions.at[initial_idx, :] = [0.0, 0.0, principal]
 
-    return positions.sort_index()
+def _pricer(trades: Trades, mkt: MarketData, principal: float) -> pd.DataFrame:
+    engine = IncrementalPositions(principal, capacity=len(mkt))
+    engine.update(mkt, trades)
+    return engine._frame()
 
 
 def calculate_positions(
@@ -81,7 +209,7 @@ def calculate_positions(
     """
     assert trades.symbol == mkt.symbol
     assert trades.currency_unit == mkt.currency_unit
-    assert trades.index.isin(mkt.index).all()
+    assert is_contained(trades.index, mkt.index)
 
     pos = Positions(_pricer(trades, mkt, principal))
     pos.reset_cols()
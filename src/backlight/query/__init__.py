@@ -1 +1,2 @@
-from backlight.query.common import query  # noqa
+from backlight.query.common import query, iter_query  # noqa
+from backlight.query.cache import QueryCache, set_default_cache  # noqa
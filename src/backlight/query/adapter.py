@@ -1,6 +1,9 @@
 from abc import ABC, abstractmethod
+from typing import Iterator
 import pandas as pd
 
+DEFAULT_CHUNKSIZE = 1000000
+
 
 class DataSourceAdapter(ABC):
     @abstractmethod
@@ -18,3 +21,27 @@ class DataSourceAdapter(ABC):
             A pandas DataFrame indexed by date from `start_dt` to `end_dt`.
         """
         pass
+
+    def iter_query(
+        self, symbol: str, start_dt: pd.Timestamp, end_dt: pd.Timestamp, chunksize: int
+    ) -> Iterator[pd.DataFrame]:
+        """Query pandas dataframes by chunks.
+
+        Together, the chunks have the rows of :meth:`query`. This default
+        slices the result of :meth:`query`. Adapters which can read their
+        source by chunks override it so that the whole range never has to fit
+        in memory, and yield the chunks in the order they are stored.
+
+        Args:
+            symbol    : Symbol name.
+            start_dt  : Start date of dataframe.
+            end_dt    : End date of dataframe.
+            chunksize : Maximum number of rows of each chunk.
+
+        Returns:
+            An iterator of pandas DataFrames indexed by date.
+        """
+        assert chunksize > 0
+        df = self.query(symbol, start_dt, end_dt)
+        for i in range(0, len(df), chunksize):
+            yield df.iloc[i : i + chunksize]
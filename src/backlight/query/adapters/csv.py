@@ -1,34 +1,388 @@
 import io
+import json
+import os
+import numpy as np
 import pandas as pd
-from boto3 import Session
-from typing import BinaryIO, Union
+from collections import namedtuple
+from typing import Any, BinaryIO, Callable, Dict, IO, Iterator, Optional
+from typing import Tuple, Union
 from urllib.parse import urlparse
 
 from backlight.query.adapter import DataSourceAdapter
 
 
-def read_csv_and_set_index(url: Union[str, BinaryIO]) -> pd.DataFrame:
-    df = pd.read_csv(url, parse_dates=True)
+# Sidecar files next to local csv files, recording the time span of the file
+# and whether it is sorted, so that later queries can skip the file or read
+# only the byte range they need.
+_SPAN_SUFFIX = ".span.json"
+
+# Sorted files smaller than this are read in full.
+_MIN_RANGE_READ_SIZE = 1 << 20
+
+_Span = namedtuple("_Span", ["start_dt", "end_dt", "is_sorted"])
+
+# pandas reads csv files with pyarrow since 1.4.
+_PANDAS_VERSION = tuple(int(x) for x in pd.__version__.split(".")[:2])
+
+
+class CSVOptions(
+    namedtuple("CSVOptions", ["dtype", "timestamp_format", "timestamp_unit", "engine"])
+):
+    """Options for the fast path of parsing csv files.
+
+    Attributes:
+        dtype            : Dtype of the columns, e.g. "float32", or a dict of
+                           dtypes by column. A dict is applied while parsing,
+                           a single dtype after.
+        timestamp_format : strptime format of the timestamps, if known.
+        timestamp_unit   : Unit of the timestamps if they are epoch numbers,
+                           e.g. "s" or "ms".
+        engine           : "pyarrow", "c", or "auto" to use pyarrow if installed.
+    """
+
+    __slots__ = ()
+
+    def __new__(
+        cls,
+        dtype: Any = None,
+        timestamp_format: Optional[str] = None,
+        timestamp_unit: Optional[str] = None,
+        engine: str = "auto",
+    ) -> "CSVOptions":
+        return super().__new__(cls, dtype, timestamp_format, timestamp_unit, engine)
+
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow.csv  # noqa
+
+        return True
+    except ImportError:
+        return False
+
+
+def _read_csv_pyarrow(
+    url: Union[str, IO[bytes]], options: CSVOptions, dtype: Dict[str, Any]
+) -> pd.DataFrame:
+    import pyarrow as pa
+    from pyarrow import csv
+
+    column_types = {c: pa.from_numpy_dtype(np.dtype(t)) for c, t in dtype.items()}
+    parsers = None if options.timestamp_format is None else [options.timestamp_format]
+    table = csv.read_csv(
+        url,
+        convert_options=csv.ConvertOptions(
+            column_types=column_types, timestamp_parsers=parsers
+        ),
+    )
+    df = table.to_pandas()
+    if len(df.columns) > 0 and df.columns[0] == "":
+        df = df.rename(columns={"": "Unnamed: 0"})  # as named by pandas
+    return df
+
+
+def _parse_csv(
+    url: Union[str, IO[bytes]], options: Optional[CSVOptions]
+) -> pd.DataFrame:
+    if options is None:
+        return pd.read_csv(url, parse_dates=True)
+
+    dtype = options.dtype if isinstance(options.dtype, dict) else {}
+    engine = options.engine
+    if engine == "auto":
+        engine = "pyarrow" if _has_pyarrow() else "c"
+    if engine == "pyarrow" and _PANDAS_VERSION < (1, 4):
+        return _read_csv_pyarrow(url, options, dtype)
+    return pd.read_csv(url, dtype=dtype, engine=engine)
+
+
+def _to_datetime(index: pd.Index, options: Optional[CSVOptions]) -> pd.Index:
+    if options is None or isinstance(index, pd.DatetimeIndex):
+        return pd.to_datetime(index)
+    if options.timestamp_unit is not None:
+        return pd.to_datetime(index, unit=options.timestamp_unit)
+    return pd.to_datetime(index, format=options.timestamp_format)
+
+
+def _set_index(df: pd.DataFrame, options: Optional[CSVOptions] = None) -> pd.DataFrame:
     if "timestamp" in df:
         df = df.set_index("timestamp")
     elif df.columns[0] == "Unnamed: 0":
         df = df.set_index(df.columns[0])
-        del df.index.name
-    df.index = pd.to_datetime(df.index)
+        df.index.name = None
+    df.index = _to_datetime(df.index, options)
+    if options is not None and options.dtype is not None:
+        if not isinstance(options.dtype, dict):
+            df = df.astype(options.dtype)
+    return df
+
+
+def _sort_index(df: pd.DataFrame) -> pd.DataFrame:
+    if df.index.is_monotonic_increasing:
+        return df
     return df.sort_index()
 
 
+def _read_csv(
+    url: Union[str, IO[bytes]], options: Optional[CSVOptions] = None
+) -> pd.DataFrame:
+    return _set_index(_parse_csv(url, options), options)
+
+
+def read_csv_and_set_index(
+    url: Union[str, IO[bytes]], options: Optional[CSVOptions] = None
+) -> pd.DataFrame:
+    """Read a csv file indexed by its timestamps, sorted.
+
+    Args:
+        url     : Path or file object of the csv file.
+        options : Options of the fast path. The timestamps are inferred and the
+                  file is parsed by pandas if None.
+    """
+    return _sort_index(_read_csv(url, options))
+
+
+def _load_span(path: str) -> Optional[_Span]:
+    try:
+        stat = os.stat(path)
+        with open(path + _SPAN_SUFFIX) as f:
+            span = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if span["mtime_ns"] != stat.st_mtime_ns or span["size"] != stat.st_size:
+        return None  # the file has changed
+    return _Span(
+        pd.Timestamp(span["start_dt"]), pd.Timestamp(span["end_dt"]), span["is_sorted"]
+    )
+
+
+def _save_span(path: str, df: pd.DataFrame) -> None:
+    if len(df) == 0:
+        return
+    try:
+        stat = os.stat(path)
+        tmp = "{}.{}".format(path + _SPAN_SUFFIX, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(
+                {
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "start_dt": df.index.min().isoformat(),
+                    "end_dt": df.index.max().isoformat(),
+                    "is_sorted": bool(df.index.is_monotonic_increasing),
+                },
+                f,
+            )
+        os.replace(tmp, path + _SPAN_SUFFIX)
+    except OSError:
+        pass  # e.g. read-only directory
+
+
+def is_span_file(path: str) -> bool:
+    """Whether `path` is a sidecar file written next to a csv file, which
+    globs of the csv files should skip."""
+    return _SPAN_SUFFIX in os.path.basename(path)
+
+
+def _is_outside(span: _Span, start_dt: pd.Timestamp, end_dt: pd.Timestamp) -> bool:
+    try:
+        return span.end_dt < start_dt or end_dt < span.start_dt
+    except TypeError:  # comparing tz-naive and tz-aware timestamps
+        return False
+
+
+def _next_line(f: BinaryIO, offset: int) -> Tuple[int, int, Optional[pd.Timestamp]]:
+    """Start, end and timestamp of the first line which starts at `offset` or
+    after. The timestamp is None at the end of the file."""
+    f.seek(offset - 1)
+    f.readline()
+    start = f.tell()
+    line = f.readline()
+    if line.strip() == b"":
+        return start, f.tell(), None
+    field = line.split(b",", 1)[0].strip().strip(b'"')
+    return start, f.tell(), pd.Timestamp(field.decode())
+
+
+def _search(f: BinaryIO, lo: int, hi: int, is_after: Callable[[Any], bool]) -> int:
+    """Start of the first line in `[lo, hi)` whose timestamp `is_after` the
+    bound, or `hi`. `lo` must be the start of a line."""
+    while lo < hi:
+        start, end, timestamp = _next_line(f, (lo + hi) // 2)
+        if start >= hi:  # no line starts in the upper half
+            start, end, timestamp = _next_line(f, lo)
+            if timestamp is None or is_after(timestamp):
+                return lo
+            lo = end
+        elif timestamp is None or is_after(timestamp):
+            hi = start
+        else:
+            lo = end
+    return hi
+
+
+def _read_range(
+    path: str,
+    start_dt: pd.Timestamp,
+    end_dt: pd.Timestamp,
+    options: Optional[CSVOptions] = None,
+) -> pd.DataFrame:
+    """Read the lines of a sorted csv file from `start_dt` to `end_dt`, found by
+    binary search on the byte offsets. The timestamp must be the first column."""
+    with open(path, "rb") as f:
+        header = f.readline()
+        first_column = header.split(b",", 1)[0].strip().strip(b'"')
+        if first_column not in (b"timestamp", b""):
+            return read_csv_and_set_index(path, options)[start_dt:end_dt]
+
+        size = os.fstat(f.fileno()).st_size
+        lo = _search(f, len(header), size, lambda t: t >= start_dt)
+        hi = _search(f, lo, size, lambda t: t > end_dt)
+        f.seek(lo)
+        body = f.read(hi - lo)
+
+    return read_csv_and_set_index(io.BytesIO(header + body), options)[start_dt:end_dt]
+
+
+def is_csv_outside(path: str, start_dt: pd.Timestamp, end_dt: pd.Timestamp) -> bool:
+    """Whether a local csv file is known to have no rows from `start_dt` to
+    `end_dt`, from the time span recorded by `read_csv_in_range`."""
+    span = _load_span(path)
+    if span is None:
+        return False
+    return _is_outside(span, pd.Timestamp(start_dt), pd.Timestamp(end_dt))
+
+
+def read_csv_in_range(
+    path: str,
+    start_dt: pd.Timestamp,
+    end_dt: pd.Timestamp,
+    options: Optional[CSVOptions] = None,
+) -> pd.DataFrame:
+    """Read a local csv file from `start_dt` to `end_dt`.
+
+    The time span of the file is recorded in a sidecar file at the first read.
+    Then only the header is read when the file is outside the range, and only
+    the needed byte range is read when it is sorted.
+
+    Args:
+        path      : Path to the csv file.
+        start_dt  : Start date of dataframe.
+        end_dt    : End date of dataframe.
+        options   : Options of the fast path, see `read_csv_and_set_index`.
+
+    Returns:
+        A pandas DataFrame indexed by date from `start_dt` to `end_dt`.
+    """
+    start_dt, end_dt = pd.Timestamp(start_dt), pd.Timestamp(end_dt)
+    span = _load_span(path)
+    if span is None:
+        df = _read_csv(path, options)
+        _save_span(path, df)
+        return _sort_index(df)[start_dt:end_dt]
+
+    if _is_outside(span, start_dt, end_dt):
+        with open(path, "rb") as f:
+            return read_csv_and_set_index(io.BytesIO(f.readline()))
+    if span.is_sorted and os.path.getsize(path) >= _MIN_RANGE_READ_SIZE:
+        try:
+            return _read_range(path, start_dt, end_dt, options)
+        except (TypeError, ValueError):  # e.g. timestamps with other time zones
+            pass
+    return read_csv_and_set_index(path, options)[start_dt:end_dt]
+
+
+def _seek_start(f: BinaryIO, header: bytes, start_dt: pd.Timestamp) -> None:
+    """Seek the first line of a sorted csv file from `start_dt`, or the first
+    line after the header if the lines cannot be searched."""
+    first_column = header.split(b",", 1)[0].strip().strip(b'"')
+    if first_column in (b"timestamp", b""):
+        size = os.fstat(f.fileno()).st_size
+        try:
+            f.seek(_search(f, len(header), size, lambda t: t >= start_dt))
+            return
+        except (TypeError, ValueError):  # e.g. timestamps with other time zones
+            pass
+    f.seek(len(header))
+
+
+def iter_csv_in_range(
+    path: str,
+    start_dt: pd.Timestamp,
+    end_dt: pd.Timestamp,
+    chunksize: int,
+    options: Optional[CSVOptions] = None,
+) -> Iterator[pd.DataFrame]:
+    """Read a local csv file from `start_dt` to `end_dt` by chunks.
+
+    Chunks are in the order of the lines of the file, and sorted within
+    themselves. Files known to be sorted from the sidecar file of
+    `read_csv_in_range` are read from the first line in the range and only
+    until its end.
+
+    Args:
+        path      : Path to the csv file.
+        start_dt  : Start date of dataframe.
+        end_dt    : End date of dataframe.
+        chunksize : Maximum number of lines read at a time.
+        options   : Options of the fast path, see `read_csv_and_set_index`.
+                    Chunks are always parsed by pandas.
+
+    Returns:
+        An iterator of pandas DataFrames indexed by date.
+    """
+    start_dt, end_dt = pd.Timestamp(start_dt), pd.Timestamp(end_dt)
+    span = _load_span(path)
+    if span is not None and _is_outside(span, start_dt, end_dt):
+        return
+    is_sorted = span is not None and span.is_sorted
+
+    with open(path, "rb") as f:
+        header = f.readline()
+        columns = pd.read_csv(io.BytesIO(header)).columns
+        if is_sorted:
+            _seek_start(f, header, start_dt)
+        dtype = None
+        if options is not None and isinstance(options.dtype, dict):
+            dtype = options.dtype
+        chunks = pd.read_csv(
+            f, header=None, names=columns, dtype=dtype, chunksize=chunksize
+        )
+        for chunk in chunks:
+            df = _set_index(chunk, options)
+            in_range = df[(start_dt <= df.index) & (df.index <= end_dt)]
+            if len(in_range) > 0:
+                yield in_range if is_sorted else in_range.sort_index()
+            if is_sorted and df.index[-1] > end_dt:
+                break
+
+
+def make_s3client(**config: Any) -> Any:
+    """Create a s3 client, importing boto3 only when it is needed.
+
+    Args:
+        config  : Arguments of `botocore.config.Config`.
+    """
+    from boto3 import Session
+    from botocore.config import Config
+
+    return Session().client("s3", config=Config(**config))
+
+
 class CSVAdapter(DataSourceAdapter):
     """Data source adapter for csv files"""
 
-    def __init__(self, url: str) -> None:
+    def __init__(self, url: str, options: Optional[CSVOptions] = None) -> None:
         """Initializer.
 
         Args:
             url     : Url to specify local file path. It shoule start with "file".
+            options : Options of the fast path of parsing.
         """
         self._url = urlparse(url)
         assert self._url.scheme in ("file",)
+        self._path = self._url.netloc + self._url.path
+        self._options = options
 
     def query(
         self, symbol: str, start_dt: pd.Timestamp, end_dt: pd.Timestamp
@@ -37,14 +391,29 @@ class CSVAdapter(DataSourceAdapter):
 
         See also :class:`backlight.query.adapter`.
         """
-        return read_csv_and_set_index(self._url.path)[start_dt:end_dt]
+        return read_csv_in_range(self._path, start_dt, end_dt, self._options)
+
+    def iter_query(
+        self, symbol: str, start_dt: pd.Timestamp, end_dt: pd.Timestamp, chunksize: int
+    ) -> Iterator[pd.DataFrame]:
+        """Query pandas dataframes by chunks, in the order of the file.
+
+        See also :class:`backlight.query.adapter`.
+        """
+        return iter_csv_in_range(self._path, start_dt, end_dt, chunksize, self._options)
 
 
 class S3CSVAdapter(DataSourceAdapter):
     """Data source adapter for csv files on s3
     """
 
-    _s3client = Session().client("s3")
+    _s3client = None  # type: Any
+
+    @classmethod
+    def _get_s3client(cls) -> Any:
+        if cls._s3client is None:
+            cls._s3client = make_s3client()
+        return cls._s3client
 
     def __init__(self, url: str) -> None:
         """Initializer.
@@ -65,9 +434,7 @@ class S3CSVAdapter(DataSourceAdapter):
         bucket = self._url.netloc
         key = self._url.path[1:]  # delete first '/'
 
-        obj = S3CSVAdapter._s3client.get_object(Bucket=bucket, Key=key)
-        df = pd.read_csv(
-            io.BytesIO(obj["Body"].read()), compression="gzip", parse_dates=True
-        )
+        obj = S3CSVAdapter._get_s3client().get_object(Bucket=bucket, Key=key)
+        df = pd.read_csv(obj["Body"], compression="gzip", parse_dates=True)
         df = df[(start_dt <= df.index) & (df.index <= end_dt)].sort_index()
         return df
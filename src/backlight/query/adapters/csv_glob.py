@@ -1,33 +1,87 @@
-from boto3 import Session
 from urllib.parse import urlparse
 import fnmatch
 import glob
-import io
+import gzip
 import pandas as pd
+import threading
+import time
 import warnings
+import weakref
+from collections import OrderedDict
+from functools import partial
+from typing import Any, IO, Dict, Iterator, List, Optional, Tuple, cast
 
 from backlight.query.adapter import DataSourceAdapter
-from backlight.query.adapters.csv import read_csv_and_set_index
+from backlight.query.adapters.csv import (
+    CSVOptions,
+    is_csv_outside,
+    is_span_file,
+    iter_csv_in_range,
+    make_s3client,
+    read_csv_and_set_index,
+    read_csv_in_range,
+)
+from backlight.query.loader import DEFAULT_MAX_WORKERS, Timing, load_files
+
+DEFAULT_LISTING_TTL = 60.0
+
+# Maximum number of listings kept by `_list_s3_keys_with_cache`.
+LISTING_CACHE_SIZE = 128
 
 
 class CSVGlobAdapter(DataSourceAdapter):
     """Data source adapter for csv files which is compatible with glob url
     """
 
-    def __init__(self, url: str) -> None:
+    def __init__(
+        self,
+        url: str,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        use_processes: bool = False,
+        options: Optional[CSVOptions] = None,
+    ) -> None:
         """Initializer.
 
         Args:
-            url     : Url to specify local file path. It shoule start with "file".
+            url           : Url to specify local file path. It shoule start with
+                            "file".
+            max_workers   : Maximum number of files read at the same time.
+            use_processes : Read files in processes instead of threads.
+            options       : Options of the fast path of parsing.
         """
         self._url = urlparse(url)
         assert self._url.scheme in ("file",)
+        self._max_workers = max_workers
+        self._use_processes = use_processes
+        self._options = options
+        self.timings = []  # type: List[Timing]
+
+    def _paths(
+        self, symbol: str, start_dt: pd.Timestamp, end_dt: pd.Timestamp
+    ) -> List[str]:
+        return [
+            path
+            for path in sorted(glob.glob(self._url.path))
+            if symbol in path
+            and not is_span_file(path)
+            and not is_csv_outside(path, start_dt, end_dt)
+        ]
 
     def query(
         self, symbol: pd.Timestamp, start_dt: pd.Timestamp, end_dt: str
     ) -> pd.DataFrame:
-        paths = glob.glob(self._url.path)
-        dfs = [read_csv_and_set_index(path) for path in paths if symbol in path]
+        paths = self._paths(symbol, start_dt, end_dt)
+        dfs, self.timings = load_files(
+            partial(
+                read_csv_in_range,
+                start_dt=start_dt,
+                end_dt=end_dt,
+                options=self._options,
+            ),
+            paths,
+            max_workers=self._max_workers,
+            use_processes=self._use_processes,
+        )
 
         if len(dfs) == 0:
             return pd.DataFrame()
@@ -36,17 +90,74 @@ class CSVGlobAdapter(DataSourceAdapter):
         df = df[(start_dt <= df.index) & (df.index <= end_dt)]
         return df
 
+    def iter_query(
+        self, symbol: str, start_dt: pd.Timestamp, end_dt: pd.Timestamp, chunksize: int
+    ) -> Iterator[pd.DataFrame]:
+        """Query pandas dataframes by chunks, file by file in the order of their
+        paths. Files are read one by one.
 
-def _list_s3_keys(s3client: Session.client, bucket: str, prefix: str = "") -> list:
-    response = s3client.list_objects(Bucket=bucket, Prefix=prefix)
-    if "Contents" not in response:
+        See also :class:`backlight.query.adapter`.
+        """
+        for path in self._paths(symbol, start_dt, end_dt):
+            chunks = iter_csv_in_range(path, start_dt, end_dt, chunksize, self._options)
+            for df in chunks:
+                yield df
+
+
+def _list_s3_keys(s3client: Any, bucket: str, prefix: str = "") -> list:
+    keys = []  # type: List[str]
+    kwargs = {"Bucket": bucket, "Prefix": prefix}
+    while True:
+        response = s3client.list_objects_v2(**kwargs)
+        keys.extend(content["Key"] for content in response.get("Contents", []))
+        if not response.get("IsTruncated"):
+            break
+        kwargs["ContinuationToken"] = response["NextContinuationToken"]
+
+    if len(keys) == 0:
         warnings.warn(
             "No contents in the response of "
-            "s3client.list_objects(Bucket=bucket, Prefix=prefix)"
+            "s3client.list_objects_v2(Bucket=bucket, Prefix=prefix)"
             "where bucket={}, prefix={}".format(bucket, prefix)
         )
-        return []
-    return [content["Key"] for content in response["Contents"]]
+    return keys
+
+
+# Listings by bucket and prefix, as tuples of a weak reference to the client,
+# the time of the listing and the keys, from the least recently listed.
+_listing_cache = OrderedDict()  # type: Dict[Tuple[str, str], Tuple[Any, float, list]]
+_listing_cache_lock = threading.Lock()
+
+
+def _list_s3_keys_with_cache(
+    s3client: Any, bucket: str, prefix: str, ttl: float
+) -> list:
+    with _listing_cache_lock:
+        cached = _listing_cache.get((bucket, prefix))
+    if cached is not None:
+        client_ref, listed_at, keys = cached
+        if client_ref() is s3client and time.monotonic() - listed_at < ttl:
+            return keys
+
+    # Listed without the lock, so concurrent queries may list the same prefix.
+    keys = _list_s3_keys(s3client, bucket, prefix=prefix)
+    with _listing_cache_lock:
+        _listing_cache.pop((bucket, prefix), None)
+        _listing_cache[(bucket, prefix)] = (
+            weakref.ref(s3client),
+            time.monotonic(),
+            keys,
+        )
+        while len(_listing_cache) > LISTING_CACHE_SIZE:
+            del _listing_cache[next(iter(_listing_cache))]
+    return keys
+
+
+def _open_s3_object(obj: dict, key: str) -> IO[bytes]:
+    """Stream of the object body, decompressed on the fly if gzipped."""
+    if key.endswith(".gz") or obj.get("ContentEncoding") == "gzip":
+        return cast(IO[bytes], gzip.GzipFile(fileobj=obj["Body"]))
+    return obj["Body"]
 
 
 class S3CSVGlobAdapter(DataSourceAdapter):
@@ -54,16 +165,41 @@ class S3CSVGlobAdapter(DataSourceAdapter):
     glob url
     """
 
-    _s3client = Session().client("s3")
-
-    def __init__(self, url: str) -> None:
+    _s3client = None  # type: Any
+    _s3client_connections = DEFAULT_MAX_WORKERS
+
+    @classmethod
+    def _get_s3client(cls, max_workers: int) -> Any:
+        """Client shared by the adapters, with a pool of connections large
+        enough for `max_workers` concurrent loads. It is replaced by a larger
+        one when an adapter needs more connections."""
+        if cls._s3client is None or max_workers > cls._s3client_connections:
+            connections = max(max_workers, cls._s3client_connections)
+            cls._s3client = make_s3client(max_pool_connections=connections)
+            cls._s3client_connections = connections
+        return cls._s3client
+
+    def __init__(
+        self,
+        url: str,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        listing_ttl: float = DEFAULT_LISTING_TTL,
+        options: Optional[CSVOptions] = None,
+    ) -> None:
         """Initializer.
 
         Args:
-            url     : Url to specify s3 file path. It shoule start with "s3".
+            url         : Url to specify s3 file path. It shoule start with "s3".
+            max_workers : Maximum number of objects loaded at the same time.
+            listing_ttl : Seconds to reuse the listing of keys for.
+            options     : Options of the fast path of parsing.
         """
         self._url = urlparse(url)
         assert self._url.scheme in ("s3",)
+        self._max_workers = max_workers
+        self._listing_ttl = listing_ttl
+        self._options = options
+        self.timings = []  # type: List[Timing]
 
     def query(
         self, symbol: str, start_dt: pd.Timestamp, end_dt: pd.Timestamp
@@ -75,19 +211,20 @@ class S3CSVGlobAdapter(DataSourceAdapter):
         bucket = self._url.netloc
         key = self._url.path[1:]  # delete first '/'
 
-        s3keys = _list_s3_keys(
-            S3CSVGlobAdapter._s3client, bucket, prefix=key.split("*")[0]
+        s3client = S3CSVGlobAdapter._get_s3client(self._max_workers)
+        s3keys = _list_s3_keys_with_cache(
+            s3client, bucket, key.split("*")[0], self._listing_ttl
         )
 
-        objects = [
-            S3CSVGlobAdapter._s3client.get_object(Bucket=bucket, Key=s3key)
-            for s3key in s3keys
-            if fnmatch.fnmatch(s3key, key) and symbol in s3key
-        ]
+        def _load(s3key: str) -> pd.DataFrame:
+            obj = s3client.get_object(Bucket=bucket, Key=s3key)
+            return read_csv_and_set_index(_open_s3_object(obj, s3key), self._options)
 
-        dfs = [
-            read_csv_and_set_index(io.BytesIO(obj["Body"].read())) for obj in objects
-        ]
+        dfs, self.timings = load_files(
+            _load,
+            [k for k in s3keys if fnmatch.fnmatch(k, key) and symbol in k],
+            max_workers=self._max_workers,
+        )
 
         if len(dfs) == 0:
             return pd.DataFrame()
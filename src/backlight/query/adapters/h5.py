@@ -1,15 +1,75 @@
 import pandas as pd
+from typing import Iterator
+from urllib.parse import urlparse
 
 from backlight.query.adapter import DataSourceAdapter
 
 
 class H5Adapter(DataSourceAdapter):
-    """Data source adapter for H5 file"""
+    """Data source adapter for H5 file
+
+    Each symbol is stored under its own key, e.g. written by
+    `df.to_hdf(path, symbol, format="table")`. Stores in the table format are
+    read only within the date range, fixed format stores are read in full.
+    """
 
     def __init__(self, url: str) -> None:
-        self._url = url
+        """Initializer.
+
+        Args:
+            url     : Url to specify local file path. It shoule start with "file".
+        """
+        self._url = urlparse(url)
+        assert self._url.scheme in ("file",)
+        # `file://name` keeps a relative path in the host part.
+        self._path = self._url.netloc + self._url.path
+
+    def _select(
+        self,
+        store: pd.HDFStore,
+        symbol: str,
+        start_dt: pd.Timestamp,
+        end_dt: pd.Timestamp,
+        **kwargs: int
+    ) -> pd.DataFrame:
+        if not store.get_storer(symbol).is_table:
+            return store.select(symbol)[start_dt:end_dt]
+        where = "index >= start_dt & index <= end_dt"
+        return store.select(symbol, where=where, **kwargs)
 
     def query(
         self, symbol: str, start_dt: pd.Timestamp, end_dt: pd.Timestamp
     ) -> pd.DataFrame:
-        pass
+        """Query pandas dataframe.
+
+        See also :class:`backlight.query.adapter`.
+        """
+        start_dt, end_dt = pd.Timestamp(start_dt), pd.Timestamp(end_dt)
+        with pd.HDFStore(self._path, mode="r") as store:
+            return self._select(store, symbol, start_dt, end_dt).sort_index()
+
+    def iter_query(
+        self, symbol: str, start_dt: pd.Timestamp, end_dt: pd.Timestamp, chunksize: int
+    ) -> Iterator[pd.DataFrame]:
+        """Query pandas dataframes by chunks, in the order they are stored.
+
+        Args:
+            symbol    : Symbol name.
+            start_dt  : Start date of dataframe.
+            end_dt    : End date of dataframe.
+            chunksize : Number of rows of each chunk.
+
+        Returns:
+            An iterator of pandas DataFrames indexed by date.
+        """
+        start_dt, end_dt = pd.Timestamp(start_dt), pd.Timestamp(end_dt)
+        with pd.HDFStore(self._path, mode="r") as store:
+            if not store.get_storer(symbol).is_table:
+                df = self._select(store, symbol, start_dt, end_dt)
+                for i in range(0, len(df), chunksize):
+                    yield df.iloc[i : i + chunksize]
+                return
+
+            chunks = self._select(store, symbol, start_dt, end_dt, chunksize=chunksize)
+            for chunk in chunks:
+                yield chunk
@@ -1,15 +1,74 @@
 import pandas as pd
+import re
+import urllib.parse
 
 from backlight.query.adapter import DataSourceAdapter
+from backlight.query.adapters.qipc import Symbol, get_pool
+
+
+_SELECT = "{{[s;a;b] select from {table} where {sym}=s, {time} within (a;b)}}"
+
+_IDENTIFIER = re.compile(r"^\.?[A-Za-z][A-Za-z0-9_]*(\.[A-Za-z][A-Za-z0-9_]*)*$")
+
+
+def _identifier(name: str) -> str:
+    """Check `name` is a q identifier, since it is pasted into the select."""
+    if not _IDENTIFIER.match(name):
+        raise ValueError("Invalid q identifier: {!r}".format(name))
+    return name
 
 
 class KDBAdapter(DataSourceAdapter):
-    """Data source adapter for KDB"""
+    """Data source adapter for KDB
+
+    The url is `kdb://[user:password@]host:port/table[?time=time&sym=sym]`,
+    where `time` and `sym` name the columns of timestamps and symbols. The
+    selection runs on the kdb+ process and the columns of the result are
+    decoded straight into NumPy arrays. Connections are pooled per process.
+    """
 
     def __init__(self, url: str) -> None:
+        """Initializer.
+
+        Args:
+            url : Url of the table. It should start with "kdb".
+        """
+        o = urllib.parse.urlparse(url)
+        assert o.scheme == "kdb"
+        if o.hostname is None or o.port is None:
+            raise ValueError("Host and port are required in kdb url: {}".format(url))
         self._url = url
+        self._host = o.hostname  # type: str
+        self._port = o.port  # type: int
+        self._username = urllib.parse.unquote(o.username or "")
+        self._password = urllib.parse.unquote(o.password or "")
+
+        params = dict(urllib.parse.parse_qsl(o.query))
+        self._table = o.path.strip("/")
+        self._time = params.get("time", "time")
+        self._sym = params.get("sym", "sym")
 
     def query(
         self, symbol: str, start_dt: pd.Timestamp, end_dt: pd.Timestamp
     ) -> pd.DataFrame:
-        pass
+        """Query pandas dataframe.
+
+        The rows of `symbol` from `start_dt` to `end_dt` inclusive, indexed by
+        the column of timestamps. The column of symbols is dropped.
+
+        See also :class:`backlight.query.adapter`.
+        """
+        select = _SELECT.format(
+            table=_identifier(self._table),
+            time=_identifier(self._time),
+            sym=_identifier(self._sym),
+        )
+        pool = get_pool(self._host, self._port, self._username, self._password)
+        with pool.connection() as conn:
+            df = conn.sync(
+                select, Symbol(symbol), pd.Timestamp(start_dt), pd.Timestamp(end_dt)
+            )
+        df = df.drop(columns=[self._sym]).set_index(self._time)
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index(kind="mergesort")
+        return df
@@ -1,23 +1,63 @@
+import numpy as np
 import pandas as pd
-from typing import Iterable
+from typing import Any, Iterable, List, Optional, Tuple
 
 from backlight.query.adapter import DataSourceAdapter
 from backlight.query.common import adapter_factory
+from backlight.query.loader import DEFAULT_MAX_WORKERS, Timing, load_files
+
+
+def _merge(dfs: List[pd.DataFrame]) -> Tuple[pd.DataFrame, np.ndarray]:
+    """Merge DataFrames by index. Rows with the same index stay in the order of
+    `dfs`. Also returns the position in `dfs` of the source of each row."""
+    dfs = [df if df.index.is_monotonic_increasing else df.sort_index() for df in dfs]
+    df = pd.concat(dfs, axis=0)
+    sources = np.repeat(np.arange(len(dfs)), [len(d) for d in dfs])
+    # The stable sort merges the sorted runs, as timsort in NumPy >= 1.17.
+    order = np.argsort(df.index.values, kind="mergesort")
+    return df.take(order), sources[order]
+
+
+def _drop_duplicates(df: pd.DataFrame, sources: np.ndarray, keep: str) -> pd.DataFrame:
+    """Keep the rows of a single source for timestamps found in several ones.
+
+    Rows of the same source are all kept, even if they share a timestamp."""
+    grouped = pd.Series(sources, index=df.index).groupby(level=0)
+    kept = grouped.transform("min" if keep == "first" else "max").values
+    return df[sources == kept]
 
 
 class MergeAdapter(DataSourceAdapter):
     """Data source adapter for multiple data sources"""
 
-    def __init__(self, urls: Iterable[str]) -> None:
+    def __init__(
+        self,
+        urls: Iterable[str],
+        duplicates: Optional[str] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        **kwargs: Any
+    ) -> None:
         """Initializer.
 
         Args:
-            urls    : Urls for multiple data sources. `urls` should
-                      be castable into :class:`tuple`. Each element
-                      should be implemented in
-                      :class:`~backlight.query.common.adapter_factory`.
+            urls        : Urls for multiple data sources. `urls` should
+                          be castable into :class:`tuple`. Each element
+                          should be implemented in
+                          :class:`~backlight.query.common.adapter_factory`.
+            duplicates  : Which rows to keep for timestamps in several
+                          sources. "first" or "last" keeps the ones of the
+                          first or the last source in `urls`, None keeps all.
+                          Rows of one source are never dropped.
+            max_workers : Maximum number of sources queried at the same time.
+            kwargs      : Keyword arguments of the adapters of `urls`, see
+                          :func:`~backlight.query.common.adapter_factory`.
         """
+        assert duplicates in (None, "first", "last")
         self._urls = tuple(urls)
+        self._duplicates = duplicates
+        self._max_workers = max_workers
+        self._kwargs = kwargs
+        self.timings = []  # type: List[Timing]
 
     def query(
         self, symbol: str, start_dt: pd.Timestamp, end_dt: pd.Timestamp
@@ -26,8 +66,15 @@ class MergeAdapter(DataSourceAdapter):
 
         See also :class:`backlight.query.adapter`.
         """
-        adapters = [adapter_factory(url) for url in self._urls]
-        dfs = [a.query(symbol, start_dt, end_dt) for a in adapters]
-        df = pd.concat(dfs, axis=0).sort_index()
+        dfs, self.timings = load_files(
+            lambda url: adapter_factory(url, **self._kwargs).query(
+                symbol, start_dt, end_dt
+            ),
+            self._urls,
+            max_workers=self._max_workers,
+        )
+        df, sources = _merge(dfs)
+        if self._duplicates is not None:
+            df = _drop_duplicates(df, sources, self._duplicates)
         df = df[(start_dt <= df.index) & (df.index <= end_dt)]
         return df
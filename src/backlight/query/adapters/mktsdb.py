@@ -1,20 +1,86 @@
 import logging
 import os
 import pandas as pd
+import socket
+import threading
+import time
 import urllib.parse
+from functools import partial
+from typing import Any, Callable, Dict, List, Tuple, Type
 
 from libalpaca.marketstore import client
 
 from backlight.query.adapter import DataSourceAdapter
+from backlight.query.loader import load_files
 
 logger = logging.getLogger(__name__)
 DEFAULT_RETRIES = 100
+RETRY_INTERVAL = 0.1
+MAX_RETRY_INTERVAL = 10.0
+
+
+def _transient_errors() -> Tuple[Type[BaseException], ...]:
+    """Errors of the connection to Marketstore, which are worth a retry."""
+    errors = (
+        ConnectionError,
+        TimeoutError,
+        socket.timeout,
+    )  # type: Tuple[Type[BaseException], ...]
+    try:
+        import requests
+    except ImportError:
+        return errors
+    return errors + (requests.ConnectionError, requests.Timeout)
+
+
+TRANSIENT_ERRORS = _transient_errors()
+
+_clients = {}  # type: Dict[Tuple[Any, Any], Any]
+_clients_lock = threading.Lock()
+
+
+def get_client(hostname: Any, port: Any) -> Any:
+    """Marketstore client shared by the adapters of the same process.
+
+    Args:
+        hostname : Host of Marketstore.
+        port     : Port of Marketstore.
+
+    Returns:
+        The client of `hostname` and `port`.
+    """
+    key = (hostname, None if port is None else str(port))
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = client.Client(host=hostname, port=port)
+        return _clients[key]
+
+
+def _retry(func: Callable[[], Any], retries: int = DEFAULT_RETRIES) -> Any:
+    """Call `func`, retrying on transient errors with an exponential backoff
+    up to `MAX_RETRY_INTERVAL`.
+
+    Other errors are raised at once."""
+    if retries < 1:
+        raise ValueError("retries must be at least 1, got {}".format(retries))
+    for i in range(retries - 1):
+        try:
+            return func()
+        except TRANSIENT_ERRORS as e:
+            logger.warning("Retrying a query to Marketstore: %s", e)
+            time.sleep(min(RETRY_INTERVAL * 2 ** i, MAX_RETRY_INTERVAL))
+    return func()
 
 
 class MarketstoreAdapter(DataSourceAdapter):
-    """Data source adapter for Marketstore"""
+    """Data source adapter for Marketstore
+
+    Clients are shared per host and port, so adapters are cheap to create.
+    Queries failing on the connection are tried up to `retries` times, other
+    errors are raised at once.
+    """
 
-    def __init__(self, url: str) -> None:
+    def __init__(self, url: str, retries: int = DEFAULT_RETRIES) -> None:
         if url is None:
             hostname = os.environ.get("MARKETSTORE_HOST")
             port = os.environ.get("MARKETSTORE_PORT")
@@ -23,7 +89,8 @@ class MarketstoreAdapter(DataSourceAdapter):
             assert o.scheme == "mktsdb"
             hostname = o.hostname
             port = o.port
-        self._cli = client.Client(host=hostname, port=port)
+        self._cli = get_client(hostname, port)
+        self._retries = retries
 
     def query(
         self,
@@ -33,7 +100,43 @@ class MarketstoreAdapter(DataSourceAdapter):
         timeframe: str = "1Min",
     ) -> pd.DataFrame:
 
-        ret = self._cli.query(
-            symbol=symbol, timeframe=timeframe, start_dt=start_dt, end_dt=end_dt
+        ret = _retry(
+            partial(
+                self._cli.query,
+                symbol=symbol,
+                timeframe=timeframe,
+                start_dt=start_dt,
+                end_dt=end_dt,
+            ),
+            self._retries,
         )
         return ret.sort_index()
+
+    def query_many(
+        self,
+        symbols: List[str],
+        start_dt: pd.Timestamp,
+        end_dt: pd.Timestamp,
+        timeframe: str = "1Min",
+        max_workers: int = 1,
+    ) -> Dict[str, pd.DataFrame]:
+        """Query pandas dataframes of several symbols.
+
+        Args:
+            symbols     : Symbol names.
+            start_dt    : Start date of dataframes.
+            end_dt      : End date of dataframes.
+            timeframe   : Timeframe of Marketstore.
+            max_workers : Maximum number of symbols queried at the same time
+                          over the shared client.
+
+        Returns:
+            The dataframe of each symbol.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        dfs, _ = load_files(
+            partial(self.query, start_dt=start_dt, end_dt=end_dt, timeframe=timeframe),
+            symbols,
+            max_workers=max_workers,
+        )
+        return dict(zip(symbols, dfs))
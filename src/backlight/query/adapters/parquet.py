@@ -0,0 +1,113 @@
+import pandas as pd
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from backlight.query.adapter import DataSourceAdapter
+
+
+def _time_column(schema: Any) -> str:
+    """Column of timestamps: the index stored by pandas, or `timestamp`."""
+    if schema.metadata is not None and b"pandas" in schema.metadata:
+        index_columns = schema.pandas_metadata["index_columns"]
+        names = [c for c in index_columns if isinstance(c, str)]
+        if len(names) > 0:
+            return names[0]
+    return "timestamp"
+
+
+def _to_frame(
+    df: pd.DataFrame,
+    time_column: str,
+    has_symbol: bool,
+    start_dt: pd.Timestamp,
+    end_dt: pd.Timestamp,
+) -> pd.DataFrame:
+    if time_column in df.columns:
+        df = df.set_index(time_column)
+    if has_symbol and "symbol" in df.columns:
+        del df["symbol"]
+    df.index = pd.to_datetime(df.index)
+    # Timestamps in the filter are truncated to the stored precision.
+    return df.sort_index()[start_dt:end_dt]
+
+
+class ParquetAdapter(DataSourceAdapter):
+    """Data source adapter for parquet files
+
+    The url can be a parquet file or a directory of them, possibly partitioned
+    in the hive style, e.g. `symbol=USDJPY/`. The date range and the symbol are
+    pushed down to the row groups, and only the requested columns are read.
+    """
+
+    def __init__(self, url: str, columns: Optional[List[str]] = None) -> None:
+        """Initializer.
+
+        Args:
+            url     : Url to specify local file path. It shoule start with "file".
+            columns : Columns to read. All the columns if None.
+        """
+        self._url = urlparse(url)
+        assert self._url.scheme in ("file",)
+        # `file://name` keeps a relative path in the host part.
+        self._path = self._url.netloc + self._url.path
+        self._columns = None if columns is None else list(columns)
+
+    def _scan(
+        self, symbol: str, start_dt: pd.Timestamp, end_dt: pd.Timestamp
+    ) -> Tuple[Any, Dict[str, Any], str, bool]:
+        """Dataset, arguments of its scan, column of timestamps and whether the
+        data have symbols."""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(self._path, format="parquet", partitioning="hive")
+        schema = dataset.schema
+
+        time_column = _time_column(schema)
+        time_type = schema.field(time_column).type
+        expression = (
+            ds.field(time_column) >= pa.scalar(start_dt.to_pydatetime(), time_type)
+        ) & (ds.field(time_column) <= pa.scalar(end_dt.to_pydatetime(), time_type))
+        has_symbol = "symbol" in schema.names
+        if has_symbol:
+            expression = expression & (ds.field("symbol") == symbol)
+
+        columns = None
+        if self._columns is not None:
+            columns = [time_column] + [c for c in self._columns if c != time_column]
+        return (
+            dataset,
+            dict(columns=columns, filter=expression),
+            time_column,
+            has_symbol,
+        )
+
+    def query(
+        self, symbol: str, start_dt: pd.Timestamp, end_dt: pd.Timestamp
+    ) -> pd.DataFrame:
+        """Query pandas dataframe.
+
+        If the data have a `symbol` column or partition, only the rows of
+        `symbol` are read and the column is dropped.
+
+        See also :class:`backlight.query.adapter`.
+        """
+        start_dt, end_dt = pd.Timestamp(start_dt), pd.Timestamp(end_dt)
+        dataset, scan, time_column, has_symbol = self._scan(symbol, start_dt, end_dt)
+        df = dataset.to_table(**scan).to_pandas()
+        return _to_frame(df, time_column, has_symbol, start_dt, end_dt)
+
+    def iter_query(
+        self, symbol: str, start_dt: pd.Timestamp, end_dt: pd.Timestamp, chunksize: int
+    ) -> Iterator[pd.DataFrame]:
+        """Query pandas dataframes by record batches, in the order they are
+        stored.
+
+        See also :class:`backlight.query.adapter`.
+        """
+        start_dt, end_dt = pd.Timestamp(start_dt), pd.Timestamp(end_dt)
+        dataset, scan, time_column, has_symbol = self._scan(symbol, start_dt, end_dt)
+        for batch in dataset.to_batches(batch_size=chunksize, **scan):
+            df = _to_frame(batch.to_pandas(), time_column, has_symbol, start_dt, end_dt)
+            if len(df) > 0:
+                yield df
@@ -0,0 +1,478 @@
+"""Minimal client of the kdb+ IPC protocol.
+
+Only what the query adapters need is implemented: synchronous requests, the
+common atom and vector types, dictionaries, tables and compressed messages.
+Vectors are decoded straight from the message buffer into NumPy arrays.
+"""
+import socket
+import struct
+import threading
+import numpy as np
+import pandas as pd
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+ASYNC, SYNC, RESPONSE = 0, 1, 2
+
+_HEADER = struct.Struct("<BBBBi")
+# Capability 1 instead of 3: large replies then arrive uncompressed, which is
+# much faster to receive than to decompress in Python.
+_CAPABILITY = 1
+
+# Temporal types count from 2000-01-01 instead of 1970-01-01.
+_EPOCH_NS = 946684800 * 10 ** 9
+_EPOCH_DAYS = 10957
+_NULL_LONG = np.iinfo(np.int64).min
+_NULL_INT = np.iinfo(np.int32).min
+
+# type code -> dtype of vectors of numeric types
+_DTYPES = {
+    1: np.dtype("bool"),
+    4: np.dtype("uint8"),
+    5: np.dtype("<i2"),
+    6: np.dtype("<i4"),
+    7: np.dtype("<i8"),
+    8: np.dtype("<f4"),
+    9: np.dtype("<f8"),
+    12: np.dtype("<i8"),  # timestamp, nanoseconds
+    13: np.dtype("<i4"),  # month
+    14: np.dtype("<i4"),  # date, days
+    15: np.dtype("<f8"),  # datetime, days
+    16: np.dtype("<i8"),  # timespan, nanoseconds
+    17: np.dtype("<i4"),  # minute
+    18: np.dtype("<i4"),  # second
+    19: np.dtype("<i4"),  # time, milliseconds
+}
+
+# dtype kind/size -> type code of vectors to encode
+_TYPES = {
+    np.dtype("bool"): 1,
+    np.dtype("uint8"): 4,
+    np.dtype("int16"): 5,
+    np.dtype("int32"): 6,
+    np.dtype("int64"): 7,
+    np.dtype("float32"): 8,
+    np.dtype("float64"): 9,
+}
+
+
+class QError(Exception):
+    """Error returned by the kdb+ process."""
+
+
+class Symbol(str):
+    """String to be sent as a q symbol instead of a char vector."""
+
+
+def _nat(values: np.ndarray, null: np.ndarray, unit: str) -> np.ndarray:
+    values[null] = _NULL_LONG
+    return values.view(unit).astype(unit.split("[")[0] + "[ns]")
+
+
+def _temporal(t: int, values: np.ndarray) -> np.ndarray:
+    """Convert raw temporal values to NumPy, keeping nulls as NaT."""
+    if t == 12:
+        return _nat(values + _EPOCH_NS, values == _NULL_LONG, "datetime64[ns]")
+    if t == 14:
+        days = values.astype(np.int64) + _EPOCH_DAYS
+        return _nat(days, values == _NULL_INT, "datetime64[D]")
+    if t == 15:
+        ms = np.round(np.nan_to_num(values) * 86400000.0).astype(np.int64)
+        return _nat(ms + _EPOCH_NS // 10 ** 6, np.isnan(values), "datetime64[ms]")
+    if t == 16:
+        return values.view("timedelta64[ns]")
+    if t == 19:
+        ms = values.astype(np.int64)
+        return _nat(ms, values == _NULL_INT, "timedelta64[ms]")
+    return values
+
+
+def uncompress(data: bytes) -> bytes:
+    """Uncompress the body of a compressed message.
+
+    Args:
+        data : Message without its header, starting with the uncompressed size.
+
+    Returns:
+        Uncompressed message without its header.
+    """
+    size = struct.unpack_from("<i", data, 0)[0]
+    dst = bytearray(size)
+    hashes = [0] * 256
+    s = p = 8
+    d = 4
+    i = f = 0
+    while s < size:
+        if i == 0:
+            f = data[d]
+            d += 1
+            i = 1
+        if f & i:
+            r = hashes[data[d]]
+            n = data[d + 1] + 2
+            d += 2
+            if r + n <= s:
+                dst[s : s + n] = dst[r : r + n]
+            else:  # overlapping, repeats the copied bytes
+                for m in range(n):
+                    dst[s + m] = dst[r + m]
+            # only the pairs starting before the copy are hashed
+            end = s + 1
+            while p < end:
+                hashes[dst[p] ^ dst[p + 1]] = p
+                p += 1
+            s += n
+            p = s
+        else:
+            dst[s] = data[d]
+            d += 1
+            s += 1
+            while p < s - 1:
+                hashes[dst[p] ^ dst[p + 1]] = p
+                p += 1
+        i = (i << 1) & 0xFF
+    return bytes(dst[8:])
+
+
+class _Reader:
+    def __init__(self, buf: bytes) -> None:
+        self._buf = buf
+        self._pos = 0
+
+    def _unpack(self, fmt: str) -> Any:
+        value = struct.unpack_from(fmt, self._buf, self._pos)[0]
+        self._pos += struct.calcsize(fmt)
+        return value
+
+    def _symbol(self) -> str:
+        end = self._buf.index(b"\x00", self._pos)
+        value = self._buf[self._pos : end].decode("utf-8")
+        self._pos = end + 1
+        return value
+
+    def _nul_positions(self, n: int) -> List[int]:
+        """Positions of the next `n` NUL bytes, scanned in place by windows."""
+        found = np.empty(0, dtype=np.int64)
+        start = self._pos
+        window = max(n * 8, 64)
+        while len(found) < n:
+            if start >= len(self._buf):
+                raise ValueError("Truncated symbol vector")
+            count = min(window, len(self._buf) - start)
+            view = np.frombuffer(self._buf, dtype=np.uint8, count=count, offset=start)
+            found = np.concatenate([found, np.flatnonzero(view == 0) + start])
+            start += count
+            window *= 2
+        return found[:n].tolist()
+
+    def _vector(self, t: int) -> Any:
+        self._pos += 1  # attributes
+        n = self._unpack("<i")
+        if t == 0:
+            return [self.read() for _ in range(n)]
+        if t == 10:
+            value = self._buf[self._pos : self._pos + n].decode("utf-8")
+            self._pos += n
+            return value
+        if t == 11:
+            ends = self._nul_positions(n)
+            starts = [self._pos] + [end + 1 for end in ends[:-1]]
+            names = [self._buf[a:b] for a, b in zip(starts, ends)]
+            self._pos = ends[-1] + 1 if n > 0 else self._pos
+            decoded = {name: name.decode("utf-8") for name in set(names)}
+            values = np.empty(n, dtype=object)
+            values[:] = [decoded[name] for name in names]
+            return values
+        if t not in _DTYPES:
+            raise NotImplementedError("Unsupported q type: {}".format(t))
+        dtype = _DTYPES[t]
+        values = np.frombuffer(self._buf, dtype=dtype, count=n, offset=self._pos)
+        self._pos += n * dtype.itemsize
+        return _temporal(t, values.copy())
+
+    def _atom(self, t: int) -> Any:
+        if t == -11:
+            return self._symbol()
+        if t == -10:
+            return self._unpack("c").decode("utf-8")
+        if -t not in _DTYPES:
+            raise NotImplementedError("Unsupported q type: {}".format(t))
+        dtype = _DTYPES[-t]
+        value = np.frombuffer(self._buf, dtype=dtype, count=1, offset=self._pos)
+        self._pos += dtype.itemsize
+        return _temporal(-t, value)[0]
+
+    def _table(self) -> pd.DataFrame:
+        self._pos += 2  # attributes and type of the dictionary
+        names, columns = self.read(), self.read()
+        return pd.DataFrame(dict(zip(names, columns)), columns=list(names))
+
+    def read(self) -> Any:
+        t = self._unpack("b")
+        if t == -128:
+            raise QError(self._symbol())
+        if t == 98:
+            return self._table()
+        if t in (99, 127):
+            keys, values = self.read(), self.read()
+            if isinstance(keys, pd.DataFrame) and isinstance(values, pd.DataFrame):
+                return pd.concat([keys, values], axis=1)  # keyed table
+            return dict(zip(keys, values))
+        if t == 101:
+            self._pos += 1
+            return None  # generic null
+        if 0 <= t < 20:
+            return self._vector(t)
+        if -20 < t < 0:
+            return self._atom(t)
+        raise NotImplementedError("Unsupported q type: {}".format(t))
+
+
+def decode(payload: bytes) -> Any:
+    """Decode a q object.
+
+    Args:
+        payload : Message without its header.
+
+    Returns:
+        Python object: atoms as scalars, vectors as NumPy arrays (symbols as
+        object arrays, temporal types as datetime64 or timedelta64), char
+        vectors as strings, general lists as lists, dictionaries as dicts and
+        tables as DataFrames.
+    """
+    return _Reader(payload).read()
+
+
+def _encode_array(values: np.ndarray, out: List[bytes]) -> None:
+    if values.dtype.kind == "M":
+        raw = values.astype("datetime64[ns]").view(np.int64)
+        raw = np.where(raw == _NULL_LONG, raw, raw - _EPOCH_NS)
+        out.append(struct.pack("<bbi", 12, 0, len(raw)))
+        out.append(raw.astype("<i8").tobytes())
+    elif values.dtype.kind in "OUS":
+        out.append(struct.pack("<bbi", 11, 0, len(values)))
+        out.extend(str(v).encode("utf-8") + b"\x00" for v in values)
+    elif values.dtype in _TYPES:
+        t = _TYPES[values.dtype]
+        out.append(struct.pack("<bbi", t, 0, len(values)))
+        out.append(values.astype(_DTYPES[t]).tobytes())
+    else:
+        raise NotImplementedError("Unsupported dtype: {}".format(values.dtype))
+
+
+def _encode_atom(obj: Any, out: List[bytes]) -> None:
+    if isinstance(obj, Symbol):
+        out.append(b"\xf5" + obj.encode("utf-8") + b"\x00")
+    elif isinstance(obj, str):
+        raw = obj.encode("utf-8")
+        out.append(struct.pack("<bbi", 10, 0, len(raw)) + raw)
+    elif isinstance(obj, (bool, np.bool_)):
+        out.append(struct.pack("<b?", -1, obj))
+    elif isinstance(obj, (int, np.integer)):
+        out.append(struct.pack("<bq", -7, obj))
+    elif isinstance(obj, (float, np.floating)):
+        out.append(struct.pack("<bd", -9, obj))
+    elif isinstance(obj, (pd.Timestamp, np.datetime64)):
+        ts = pd.Timestamp(obj)
+        if ts.tz is not None:
+            ts = ts.tz_convert("UTC").tz_localize(None)
+        out.append(struct.pack("<bq", -12, ts.value - _EPOCH_NS))
+    else:
+        raise NotImplementedError("Unsupported object: {}".format(type(obj)))
+
+
+def _encode(obj: Any, out: List[bytes]) -> None:
+    if isinstance(obj, (np.ndarray, pd.Index, pd.Series)):
+        _encode_array(np.asarray(obj), out)
+    elif isinstance(obj, pd.DataFrame):
+        out.append(struct.pack("<bbb", 98, 0, 99))
+        _encode_array(np.array(obj.columns, dtype=object), out)
+        _encode([obj[c].values for c in obj.columns], out)
+    elif isinstance(obj, dict):
+        out.append(b"\x63")
+        _encode(list(obj.keys()), out)
+        _encode(list(obj.values()), out)
+    elif isinstance(obj, (list, tuple)):
+        out.append(struct.pack("<bbi", 0, 0, len(obj)))
+        for item in obj:
+            _encode(item, out)
+    else:
+        _encode_atom(obj, out)
+
+
+def encode(obj: Any, msg_type: int = SYNC) -> bytes:
+    """Encode a q message.
+
+    Args:
+        obj      : Python object, see :func:`decode` for the mapping of types.
+                   Use :class:`Symbol` for symbols, `str` is a char vector.
+        msg_type : One of `ASYNC`, `SYNC` and `RESPONSE`.
+
+    Returns:
+        Message with its header.
+    """
+    out = []  # type: List[bytes]
+    _encode(obj, out)
+    payload = b"".join(out)
+    return _HEADER.pack(1, msg_type, 0, 0, _HEADER.size + len(payload)) + payload
+
+
+def _recv_exactly(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray(n)
+    view = memoryview(buf)
+    pos = 0
+    while pos < n:
+        received = sock.recv_into(view[pos:], n - pos)
+        if received == 0:
+            raise ConnectionError("Connection closed by the kdb+ process")
+        pos += received
+    return bytes(buf)
+
+
+def read_message(sock: socket.socket) -> Tuple[int, bytes]:
+    """Read a message from a socket.
+
+    Args:
+        sock : Socket to read from.
+
+    Returns:
+        Message type and payload, uncompressed and without header.
+    """
+    endian, msg_type, compressed, _, size = _HEADER.unpack(
+        _recv_exactly(sock, _HEADER.size)
+    )
+    if endian != 1:
+        raise NotImplementedError("Big endian messages are not supported")
+    payload = _recv_exactly(sock, size - _HEADER.size)
+    if compressed:
+        payload = uncompress(payload)
+    return msg_type, payload
+
+
+class QConnection:
+    """Connection to a kdb+ process."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str = "",
+        password: str = "",
+        timeout: Optional[float] = None,
+    ) -> None:
+        """Initializer.
+
+        Args:
+            host     : Host of the kdb+ process.
+            port     : Port of the kdb+ process.
+            username : User name, if required.
+            password : Password, if required.
+            timeout  : Timeout of the socket in seconds.
+        """
+        credentials = username if not password else username + ":" + password
+        self._sock = socket.create_connection((host, port), timeout)
+        try:
+            self._sock.sendall(credentials.encode("utf-8") + bytes([_CAPABILITY, 0]))
+            if len(self._sock.recv(1)) != 1:
+                raise ConnectionError("Authentication failed: {}".format(username))
+        except Exception:
+            self._sock.close()
+            raise
+
+    def sync(self, *args: Any) -> Any:
+        """Evaluate an expression synchronously.
+
+        Args:
+            args : Expression as a string, or a function as a string followed
+                   by its arguments.
+
+        Returns:
+            The decoded result.
+        """
+        obj = args[0] if len(args) == 1 else list(args)
+        self._sock.sendall(encode(obj, SYNC))
+        msg_type, payload = read_message(self._sock)
+        assert msg_type == RESPONSE
+        return decode(payload)
+
+    def close(self) -> None:
+        self._sock.close()
+
+
+class QConnectionPool:
+    """Pool of connections to a kdb+ process, reused across queries."""
+
+    def __init__(self, *args: Any, max_idle: int = 4, **kwargs: Any) -> None:
+        """Initializer.
+
+        Args:
+            args     : Arguments of :class:`QConnection`.
+            max_idle : Maximum number of idle connections kept open.
+            kwargs   : Keyword arguments of :class:`QConnection`.
+        """
+        self._args = args
+        self._kwargs = kwargs
+        self._max_idle = max_idle
+        self._idle = []  # type: List[QConnection]
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self) -> Iterator[QConnection]:
+        """Borrow a connection, opened if none is idle.
+
+        Connections on which an error occurred are closed rather than returned.
+        """
+        with self._lock:
+            conn = self._idle.pop() if len(self._idle) > 0 else None
+        if conn is None:
+            conn = QConnection(*self._args, **self._kwargs)
+        try:
+            yield conn
+        except (QError, NotImplementedError):
+            self._release(conn)  # the response was read in full
+            raise
+        except BaseException:
+            conn.close()
+            raise
+        self._release(conn)
+
+    def _release(self, conn: QConnection) -> None:
+        with self._lock:
+            if len(self._idle) < self._max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        """Close the idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_pools = {}  # type: Dict[Tuple[str, int, str, str], QConnectionPool]
+_pools_lock = threading.Lock()
+
+
+def get_pool(
+    host: str, port: int, username: str = "", password: str = ""
+) -> QConnectionPool:
+    """Pool of connections shared by the adapters of the same process.
+
+    Args:
+        host     : Host of the kdb+ process.
+        port     : Port of the kdb+ process.
+        username : User name, if required.
+        password : Password, if required.
+
+    Returns:
+        :class:`QConnectionPool` for `host`, `port` and the credentials.
+    """
+    key = (host, port, username, password)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = QConnectionPool(host, port, username, password)
+        return _pools[key]
@@ -0,0 +1,381 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+import numpy as np
+import pandas as pd
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from backlight.query.adapters.csv import is_span_file
+
+
+_META_FILE = "meta.json"
+_TMP_DIR = ".tmp"
+
+# Temporary directories older than this are left by writers which died.
+_STALE_SECONDS = 3600
+
+# Seconds to serve the results of sources other than local files for, since
+# they are not checked for changes.
+DEFAULT_TTL = 3600.0
+
+
+def _file_paths(path: str) -> Iterator[str]:
+    for p in sorted(glob.glob(path)):
+        if os.path.isdir(p):
+            for root, _, files in sorted(os.walk(p)):
+                for f in sorted(files):
+                    yield os.path.join(root, f)
+        elif not is_span_file(p):
+            yield p
+
+
+def _is_local(url: Any) -> bool:
+    if hasattr(url, "__iter__") and not isinstance(url, str):
+        return all(_is_local(u) for u in url)
+    return urlparse(url).scheme == "file"
+
+
+def _source_version(url: Any) -> Any:
+    """Sizes and modification times of the local files of `url`, so that the
+    results of files changed since they were cached are not served. Other
+    sources are not tracked."""
+    if hasattr(url, "__iter__") and not isinstance(url, str):
+        return [_source_version(u) for u in url]
+    o = urlparse(url)
+    if o.scheme != "file":
+        return None
+    version = []
+    for path in _file_paths(o.netloc + o.path):
+        try:
+            stat = os.stat(path)
+        except OSError:  # removed meanwhile
+            continue
+        version.append([path, stat.st_size, stat.st_mtime_ns])
+    return version
+
+
+def _key(url: Any, symbol: str, **kwargs: Any) -> str:
+    version = _source_version(url)
+    if hasattr(url, "__iter__") and not isinstance(url, str):
+        url = list(url)
+    return json.dumps([url, symbol, kwargs, version], sort_keys=True, default=str)
+
+
+def _contains(
+    outer: Tuple[pd.Timestamp, pd.Timestamp], inner: Tuple[pd.Timestamp, pd.Timestamp]
+) -> bool:
+    return outer[0] <= inner[0] and inner[1] <= outer[1]
+
+
+def _as_tz(timestamp: pd.Timestamp, tz: Optional[str]) -> pd.Timestamp:
+    """`timestamp` comparable with an index in `tz`. Naive timestamps are wall
+    times in `tz` as for the slicing of pandas, and aware timestamps are taken
+    in UTC for a naive index."""
+    if timestamp.tz is None:
+        return timestamp if tz is None else timestamp.tz_localize(tz)
+    if tz is None:
+        return timestamp.tz_convert("UTC").tz_localize(None)
+    return timestamp.tz_convert(tz)
+
+
+def _date_range(
+    meta: Dict[str, Any], start_dt: Any, end_dt: Any
+) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """Date range from `start_dt` to `end_dt` in the time zone of the result
+    of `meta`."""
+    return (
+        _as_tz(pd.Timestamp(start_dt), meta["tz"]),
+        _as_tz(pd.Timestamp(end_dt), meta["tz"]),
+    )
+
+
+def _cached_range(meta: Dict[str, Any]) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    return _date_range(meta, meta["start_dt"], meta["end_dt"])
+
+
+def _is_expired(meta: Dict[str, Any]) -> bool:
+    expires = meta.get("expires")
+    return expires is not None and expires <= time.time()
+
+
+def _tz(values: Any) -> Optional[str]:
+    tz = getattr(values.dtype, "tz", None)
+    return None if tz is None else str(tz)
+
+
+def _with_tz(values: np.ndarray, tz: Optional[str]) -> Any:
+    """Datetimes stored in UTC back in `tz`."""
+    if tz is None:
+        return values
+    return pd.DatetimeIndex(values).tz_localize("UTC").tz_convert(tz)
+
+
+def _is_cacheable(df: pd.DataFrame) -> bool:
+    """Only DataFrames which `np.load` can restore without pickle are cached."""
+    if not isinstance(df.index, pd.DatetimeIndex):
+        return False
+    if not (df.index.is_monotonic_increasing and df.columns.is_unique):
+        return False
+    if not all(isinstance(c, str) for c in df.columns):
+        return False
+    return all(dtype.kind in "biufcmM" for dtype in df.dtypes)
+
+
+def _load(path: str, name: str, lo: int, hi: Optional[int]) -> np.ndarray:
+    values = np.load(os.path.join(path, "{}.npy".format(name)), mmap_mode="r")
+    return np.array(values[lo:hi])
+
+
+def _read_meta(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(path, _META_FILE)) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return None  # removed by another process
+
+
+def _size(path: str) -> int:
+    size = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                size += os.path.getsize(os.path.join(root, f))
+            except OSError:  # removed meanwhile
+                pass
+    return size
+
+
+def _touch(path: str) -> None:
+    """Record an access to the result in `path`, for the LRU eviction. The time
+    is given explicitly since file systems may stamp files with a coarse clock.
+    """
+    now = time.time()
+    os.utime(os.path.join(path, _META_FILE), (now, now))
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(os.path.join(path, _META_FILE))
+    except OSError:
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0.0
+
+
+class QueryCache:
+    """Local cache of query results.
+
+    Each result is stored as raw `.npy` files, one per column and one for the
+    index, so that reading it back is a memory map. Results are keyed by url,
+    symbol, query arguments and, for local files, their sizes and modification
+    times, and serve any query within their date range. The least recently used
+    results are evicted when the cache exceeds its size. The results of other
+    sources, which can not be checked for changes, expire after `ttl` seconds.
+
+    There is no shared index: a result is written to a temporary directory and
+    renamed into place, and the sizes and access times are read from the
+    files, so that several processes can share the cache directory.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 2 ** 30,
+        ttl: Optional[float] = DEFAULT_TTL,
+    ) -> None:
+        """Initializer.
+
+        Args:
+            directory : Directory to store the cache in. Created if missing.
+            max_bytes : Maximum total size of the cached files.
+            ttl       : Seconds to serve the results of sources other than
+                        local files for. None to serve them until evicted.
+        """
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        os.makedirs(os.path.join(directory, _TMP_DIR), exist_ok=True)
+
+    def _key_dir(self, key: str) -> str:
+        return os.path.join(self._directory, hashlib.sha1(key.encode()).hexdigest())
+
+    def _entries(self, key: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Paths and metadata of the results of `key`."""
+        key_dir = self._key_dir(key)
+        names = os.listdir(key_dir) if os.path.isdir(key_dir) else []
+        for name in sorted(names):
+            path = os.path.join(key_dir, name)
+            meta = _read_meta(path)
+            if meta is not None and meta["key"] == key:
+                yield path, meta
+
+    def get(
+        self,
+        url: Any,
+        symbol: str,
+        start_dt: pd.Timestamp,
+        end_dt: pd.Timestamp,
+        **kwargs: Any
+    ) -> Optional[pd.DataFrame]:
+        """Get a cached query result.
+
+        Args:
+            url       : Url given to the query.
+            symbol    : Symbol name.
+            start_dt  : Start date of dataframe.
+            end_dt    : End date of dataframe.
+            kwargs    : Other arguments given to the query.
+
+        Returns:
+            The DataFrame from `start_dt` to `end_dt`, or None if not cached.
+        """
+        for path, meta in self._entries(_key(url, symbol, **kwargs)):
+            query_range = _date_range(meta, start_dt, end_dt)
+            if not _is_expired(meta) and _contains(_cached_range(meta), query_range):
+                break
+        else:
+            return None
+
+        try:
+            values = _load(path, "index", 0, None)
+            index = pd.DatetimeIndex(
+                _with_tz(values.view("datetime64[ns]"), meta["tz"])
+            )
+            lo, hi = index.slice_locs(*query_range)
+            data = {
+                c: _with_tz(_load(path, str(i), lo, hi), tz)
+                for i, (c, tz) in enumerate(zip(meta["columns"], meta["column_tz"]))
+            }
+            _touch(path)
+        except (IOError, ValueError):
+            return None  # removed by another process
+
+        return pd.DataFrame(
+            data=data,
+            index=index[lo:hi].rename(meta["index_name"]),
+            columns=meta["columns"],
+        )
+
+    def put(
+        self,
+        url: Any,
+        symbol: str,
+        start_dt: pd.Timestamp,
+        end_dt: pd.Timestamp,
+        df: pd.DataFrame,
+        **kwargs: Any
+    ) -> None:
+        """Cache a query result.
+
+        Args:
+            url       : Url given to the query.
+            symbol    : Symbol name.
+            start_dt  : Start date given to the query.
+            end_dt    : End date given to the query.
+            df        : Result of the query.
+            kwargs    : Other arguments given to the query.
+        """
+        if not _is_cacheable(df):
+            return
+
+        start_dt, end_dt = pd.Timestamp(start_dt), pd.Timestamp(end_dt)
+        key = _key(url, symbol, **kwargs)
+        expires = None
+        if self._ttl is not None and not _is_local(url):
+            expires = time.time() + self._ttl
+
+        entry_id = uuid.uuid4().hex
+        tmp = os.path.join(self._directory, _TMP_DIR, entry_id)
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, "index.npy"), df.index.asi8)
+        for i, c in enumerate(df.columns):
+            np.save(os.path.join(tmp, "{}.npy".format(i)), df[c].values)
+        meta = {
+            "key": key,
+            "start_dt": start_dt.isoformat(),
+            "end_dt": end_dt.isoformat(),
+            "columns": list(df.columns),
+            "column_tz": [_tz(df[c]) for c in df.columns],
+            "index_name": df.index.name,
+            "tz": _tz(df.index),
+            "expires": expires,
+        }
+        with open(os.path.join(tmp, _META_FILE), "w") as f:
+            json.dump(meta, f)
+        _touch(tmp)
+
+        superseded = [
+            path
+            for path, entry in self._entries(key)
+            if _is_expired(entry)
+            or _contains(_date_range(entry, start_dt, end_dt), _cached_range(entry))
+        ]
+        os.makedirs(self._key_dir(key), exist_ok=True)
+        os.rename(tmp, os.path.join(self._key_dir(key), entry_id))
+        for path in superseded:
+            shutil.rmtree(path, ignore_errors=True)
+
+        self._evict()
+
+    def _evict(self) -> None:
+        """Remove the least recently used results beyond `max_bytes`, counting
+        the temporary directories of writers in progress as well."""
+        now = time.time()
+        total = 0
+        entries = []  # type: List[Tuple[float, int, str]]
+        for name in os.listdir(self._directory):
+            parent = os.path.join(self._directory, name)
+            if not os.path.isdir(parent):
+                continue
+            for child in os.listdir(parent):
+                path = os.path.join(parent, child)
+                size, mtime = _size(path), _mtime(path)
+                if name != _TMP_DIR:
+                    entries.append((mtime, size, path))
+                elif now - mtime > _STALE_SECONDS:
+                    shutil.rmtree(path, ignore_errors=True)
+                    continue
+                total += size
+
+        for _, size, path in sorted(entries):
+            if total <= self._max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self) -> None:
+        """Remove all the cached results."""
+        for name in os.listdir(self._directory):
+            path = os.path.join(self._directory, name)
+            if os.path.isdir(path) and name != _TMP_DIR:
+                shutil.rmtree(path, ignore_errors=True)
+
+
+_default_cache = None  # type: Optional[QueryCache]
+if os.environ.get("BACKLIGHT_QUERY_CACHE_DIR"):
+    _default_cache = QueryCache(os.environ["BACKLIGHT_QUERY_CACHE_DIR"])
+
+
+def get_default_cache() -> Optional[QueryCache]:
+    """Cache used by :func:`backlight.query.query`, None if disabled."""
+    return _default_cache
+
+
+def set_default_cache(cache: Optional[QueryCache]) -> None:
+    """Set the cache used by :func:`backlight.query.query`.
+
+    It can also be enabled with the `BACKLIGHT_QUERY_CACHE_DIR` environment
+    variable.
+
+    Args:
+        cache : The cache, or None to disable caching.
+    """
+    global _default_cache
+    _default_cache = cache
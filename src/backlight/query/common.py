@@ -1,58 +1,132 @@
+import inspect
 import pandas as pd
 
 from urllib.parse import urlparse
-from typing import Type
+from typing import Any, Callable, Iterator
+
+from backlight.query.adapter import DEFAULT_CHUNKSIZE, DataSourceAdapter
+from backlight.query.cache import get_default_cache
+
+
+# Keyword arguments taken by the initializers of the adapters. They are listed
+# here since the adapters are imported on demand.
+_ADAPTER_KWARGS = frozenset(
+    [
+        "chunksize",
+        "columns",
+        "duplicates",
+        "listing_ttl",
+        "max_workers",
+        "options",
+        "retries",
+        "use_processes",
+    ]
+)
+
+
+def _create(
+    factory: Callable[..., DataSourceAdapter], url: Any, **kwargs: Any
+) -> DataSourceAdapter:
+    """Create an adapter with the keyword arguments its initializer takes, so
+    that the same arguments can be given for urls of any scheme."""
+    params = inspect.signature(factory).parameters
+    if not any(p.kind == p.VAR_KEYWORD for p in params.values()):
+        kwargs = {k: v for k, v in kwargs.items() if k in params}
+    return factory(url, **kwargs)
+
+
+def _file_adapter(url: str, path: str, **kwargs: Any) -> DataSourceAdapter:
+    if path.rstrip("/").endswith(".parquet"):
+        from backlight.query.adapters.parquet import ParquetAdapter
+
+        return _create(ParquetAdapter, url, **kwargs)
+    elif path.endswith(".h5"):
+        from backlight.query.adapters.h5 import H5Adapter
+
+        return _create(H5Adapter, url, **kwargs)
+    else:
+        from backlight.query.adapters.csv import CSVAdapter
+
+        return _create(CSVAdapter, url, **kwargs)
 
-from backlight.query.adapter import DataSourceAdapter
 
+def adapter_factory(url: str, **kwargs: Any) -> DataSourceAdapter:
+    """Adapter of `url`.
 
-def adapter_factory(url: str, **kwargs: str) -> DataSourceAdapter:
+    Args:
+        url    : Url of the data source, or an iterable of urls to merge.
+        kwargs : Keyword arguments of the initializers of the adapters. Each
+                 adapter takes the ones it knows and ignores the others, and
+                 TypeError is raised for the ones no adapter takes.
+    """
+    unknown = sorted(set(kwargs) - _ADAPTER_KWARGS)
+    if len(unknown) != 0:
+        raise TypeError("Unknown arguments of the adapters: {}".format(unknown))
 
     if hasattr(url, "__iter__") and not isinstance(url, str):  # check if iterable
         from backlight.query.adapters.merge import MergeAdapter
 
-        return MergeAdapter(url, **kwargs)
+        return _create(MergeAdapter, url, **kwargs)
 
     o = urlparse(url)
     if o.scheme in ("file",) and "*" in o.path:
         from backlight.query.adapters.csv_glob import CSVGlobAdapter
 
-        return CSVGlobAdapter(url)
+        return _create(CSVGlobAdapter, url, **kwargs)
     elif o.scheme in ("file",) and "*" not in o.path:
-        if o.path.endswith(".h5"):
-            from backlight.query.adapters.h5 import H5Adapter
-
-            return H5Adapter(url)
-        else:
-            from backlight.query.adapters.csv import CSVAdapter
-
-            return CSVAdapter(url)
+        return _file_adapter(url, o.netloc + o.path, **kwargs)
     elif o.scheme in ("s3",) and "*" in o.path:
         from backlight.query.adapters.csv_glob import S3CSVGlobAdapter
 
-        return S3CSVGlobAdapter(url)
+        return _create(S3CSVGlobAdapter, url, **kwargs)
     elif o.scheme in ("s3",) and "*" not in o.path:
         from backlight.query.adapters.csv import S3CSVAdapter
 
-        return S3CSVAdapter(url)
+        return _create(S3CSVAdapter, url, **kwargs)
     elif o.scheme in ("kdb",):
         from backlight.query.adapters.kdb import KDBAdapter
 
-        return KDBAdapter(url)
+        return _create(KDBAdapter, url, **kwargs)
     elif o.scheme in ("mktsdb",):
         from backlight.query.adapters.mktsdb import MarketstoreAdapter
 
-        return MarketstoreAdapter(url)
-    elif o.scheme in ("rds",):
+        return _create(MarketstoreAdapter, url, **kwargs)
+    elif o.scheme.split("+")[0] == "rds":
         from backlight.query.adapters.rds import RDSAdapter
 
-        return RDSAdapter(url)
+        return _create(RDSAdapter, url, **kwargs)
     else:
         raise NotImplementedError("Unsupported url: {}".format(url))
 
 
 def query(
-    symbol: str, start_dt: pd.Timestamp, end_dt: pd.Timestamp, url: str, **kwargs: str
+    symbol: str, start_dt: pd.Timestamp, end_dt: pd.Timestamp, url: str, **kwargs: Any
 ) -> pd.DataFrame:
+    cache = get_default_cache()
+    if cache is not None:
+        df = cache.get(url, symbol, start_dt, end_dt, **kwargs)
+        if df is not None:
+            return df
+
+    adapter = adapter_factory(url, **kwargs)
+    df = adapter.query(symbol, start_dt, end_dt)
+
+    if cache is not None:
+        cache.put(url, symbol, start_dt, end_dt, df, **kwargs)
+    return df
+
+
+def iter_query(
+    symbol: str,
+    start_dt: pd.Timestamp,
+    end_dt: pd.Timestamp,
+    url: str,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    **kwargs: Any
+) -> Iterator[pd.DataFrame]:
+    """Query pandas dataframes by chunks, without caching them.
+
+    See also :meth:`backlight.query.adapter.DataSourceAdapter.iter_query`.
+    """
     adapter = adapter_factory(url, **kwargs)
-    return adapter.query(symbol, start_dt, end_dt)
+    return adapter.iter_query(symbol, start_dt, end_dt, chunksize)
@@ -0,0 +1,61 @@
+import logging
+import time
+from collections import namedtuple
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+
+Timing = namedtuple("Timing", ["name", "seconds"])
+
+
+def _timed(func: Callable[[Any], Any], item: Any) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    result = func(item)
+    return result, time.perf_counter() - start
+
+
+def load_files(
+    func: Callable[[Any], Any],
+    items: Sequence[Any],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    use_processes: bool = False,
+) -> Tuple[List[Any], List[Timing]]:
+    """Load files concurrently.
+
+    Each file is loaded from start to end by one worker, e.g. downloaded,
+    decompressed and parsed, so that the steps of different files overlap.
+
+    Args:
+        func          : Function to load a file from an item of `items`.
+        items         : Paths, keys or anything `func` takes.
+        max_workers   : Maximum number of files loaded at the same time.
+                        Files are loaded one by one in the caller if it is 1.
+        use_processes : Use processes instead of threads, e.g. for parsing
+                        bound by the CPU. `func` and `items` must be picklable.
+
+    Returns:
+        The results of `func` in the order of `items`, and the time spent on
+        each item.
+    """
+    assert max_workers > 0
+    timed = partial(_timed, func)
+
+    if max_workers == 1 or len(items) <= 1:
+        outputs = [timed(item) for item in items]
+    else:
+        workers = min(max_workers, len(items))
+        if use_processes:
+            pool = ProcessPoolExecutor(workers)  # type: Executor
+        else:
+            pool = ThreadPoolExecutor(workers)
+        with pool:
+            outputs = list(pool.map(timed, items))
+
+    timings = [Timing(str(item), seconds) for item, (_, seconds) in zip(items, outputs)]
+    for timing in timings:
+        logger.debug("Loaded %s in %.3fs", timing.name, timing.seconds)
+    return [result for result, _ in outputs], timings
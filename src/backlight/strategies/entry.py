@@ -1,14 +1,27 @@
-import pandas as pd
+import numpy as np
 
-from typing import List
+from typing import Tuple
 
+from backlight.alignment import is_contained
 from backlight.datasource.marketdata import MarketData
 from backlight.signal.signal import Signal
-from backlight.trades import make_trade
-from backlight.trades.trades import Trades, from_dataframe
+from backlight.trades.trades import Trades, from_arrays
 from backlight.strategies.common import Action
 
 
+def _direction_amounts(direction_action_dict: dict) -> Tuple[np.ndarray, np.ndarray]:
+    """Sorted direction values and the amounts to take on them."""
+    donothing = Action.Donothing.act_on_amount()
+    lookup = {
+        direction.value: action.act_on_amount()
+        for direction, action in direction_action_dict.items()
+        if action.act_on_amount() != donothing
+    }
+    directions = np.array(sorted(lookup))
+    amounts = np.array([lookup[d] for d in directions], dtype=float)
+    return directions, amounts
+
+
 def direction_based_entry(
     mkt: MarketData, sig: Signal, direction_action_dict: dict
 ) -> Trades:
@@ -21,26 +34,24 @@ def direction_based_entry(
     Result:
         Trades
     """
-    assert all([idx in mkt.index for idx in sig.index])
-    df = sig
-
-    trades = []  # type: List[pd.Dataframe]
-    for direction, action in direction_action_dict.items():
-
-        amount = action.act_on_amount()
-        if amount == Action.Donothing.act_on_amount():
-            continue
-
-        trades.append(
-            pd.DataFrame(
-                index=df[df["pred"] == direction.value].index,
-                data=amount,
-                columns=["amount"],
-            )
-        )
-
-    df_trades = pd.concat(trades, axis=0).sort_index()
-    df_trades.loc[:, "_id"] = range(len(df_trades.index))
-
-    t = from_dataframe(df_trades, df.symbol, df.currency_unit)
-    return t
+    assert is_contained(sig.index, mkt.index)
+
+    directions, amounts = _direction_amounts(direction_action_dict)
+    pred = sig["pred"].values
+    if len(directions) == 0:
+        is_entry = np.zeros(len(pred), dtype=bool)
+        positions = np.zeros(len(pred), dtype=int)
+    else:
+        positions = np.minimum(directions.searchsorted(pred), len(directions) - 1)
+        is_entry = directions[positions] == pred
+
+    index = sig.index[is_entry]
+    amount = amounts[positions[is_entry]]
+    if not index.is_monotonic_increasing:
+        order = np.argsort(index.values, kind="mergesort")
+        index = index[order]
+        amount = amount[order]
+
+    return from_arrays(
+        index, amount, np.arange(len(index)), sig.symbol, sig.currency_unit
+    )
@@ -1,12 +1,12 @@
 import numpy as np
 import pandas as pd
 
-from typing import Callable, List, Optional, Tuple
+from typing import Callable, Optional, Tuple
 
+from backlight.alignment import is_contained
 from backlight.datasource.marketdata import MarketData
-from backlight.labelizer.common import TernaryDirection
 from backlight.signal.signal import Signal
-from backlight.trades.trades import Transaction, Trades, concat, from_dataframe
+from backlight.trades.trades import Trades, concat, from_dataframe
 
 
 def _concat(mkt: MarketData, sig: Optional[Signal]) -> pd.DataFrame:
@@ -15,75 +15,267 @@ def _concat(mkt: MarketData, sig: Optional[Signal]) -> pd.DataFrame:
 
     assert mkt.symbol == sig.symbol
     # Assume sig is less frequent than mkt.
-    assert all([idx in mkt.index for idx in sig.index])
+    assert is_contained(sig.index, mkt.index)
     df = pd.concat([mkt, sig], axis=1, join="inner")
     df.symbol = mkt.symbol
     return df
 
 
-def _exit_transaction(
+ExitCondition = Callable[[pd.DataFrame, pd.Series], pd.Series]
+VectorizedExitCondition = Callable[
+    [pd.DataFrame, np.ndarray, np.ndarray, np.ndarray], np.ndarray
+]
+
+# Width of the first block of bars scanned for each entry. It doubles at every
+# step so that the number of steps grows only logarithmically with the holding.
+_INITIAL_SCAN_WIDTH = 16
+
+# Maximum number of cells of a block, which bounds the memory of a scan. Once
+# reached, the blocks keep the same size and only grow as entries are resolved.
+_MAX_SCAN_CELLS = 1 << 20
+
+
+def vectorized_exit_condition(
+    condition: VectorizedExitCondition
+) -> VectorizedExitCondition:
+    """Mark a function as a vectorized exit condition.
+
+    A vectorized exit condition evaluates all the entries at once. It is called
+    as `condition(df, starts, amounts, positions)` where `starts` are the row
+    positions of the entries in `df`, `amounts` are their amounts and
+    `positions` is a (number of entries, width) matrix of row positions to
+    evaluate. It returns a boolean matrix with the same shape as `positions`.
+
+    Args:
+        condition: Function to mark.
+    Result:
+        The same function.
+    """
+    setattr(condition, "_vectorized", True)
+    return condition
+
+
+def _is_vectorized(condition: Callable) -> bool:
+    return getattr(condition, "_vectorized", False)
+
+
+def _entries(trades: Trades) -> Tuple[np.ndarray, pd.DatetimeIndex, np.ndarray]:
+    """Ids, entry timestamps and amounts of the trades which have to be exited."""
+    df = pd.DataFrame(
+        data={"timestamp": trades.index, "amount": trades["amount"].values},
+        index=trades["_id"].values,
+    )
+    grouped = df.groupby(level=0, sort=False)
+    timestamps = grouped["timestamp"].first()
+    amounts = grouped["amount"].sum()
+
+    is_open = amounts.values != 0
+    return (
+        amounts.index.values[is_open],
+        pd.DatetimeIndex(timestamps.values[is_open]),
+        amounts.values[is_open],
+    )
+
+
+def _scan_first_true(
+    evaluate: Callable[[np.ndarray, np.ndarray], np.ndarray],
+    starts: np.ndarray,
+    ends: np.ndarray,
+) -> np.ndarray:
+    """Find the first row satisfying a condition for all the entries at once.
+
+    Rows are scanned in blocks of growing width. Each block is evaluated as one
+    (pending entries, width) matrix and entries which are resolved are dropped
+    from the next block. The width stops growing when a block would exceed
+    `_MAX_SCAN_CELLS`, so the memory does not grow with the number of rows.
+
+    Args:
+        evaluate: `evaluate(pending, positions)` returns the boolean condition
+                  matrix for the entries `pending` at row `positions`.
+        starts: First row position to scan for each entry.
+        ends: Row position after the last one to scan for each entry.
+    Result:
+        Row positions of the first `True`, or `ends - 1` if there is none.
+    """
+    exits = ends - 1
+    pending = np.arange(len(starts))
+    offset = 0
+    width = _INITIAL_SCAN_WIDTH
+    while len(pending) != 0:
+        lo = starts[pending] + offset
+        hi = ends[pending]
+        positions = lo[:, None] + np.arange(width)
+        is_valid = positions < hi[:, None]
+        positions = np.minimum(positions, hi[:, None] - 1)
+
+        hit = np.asarray(evaluate(pending, positions), dtype=bool) & is_valid
+        found = hit.any(axis=1)
+        exits[pending[found]] = positions[found, hit[found].argmax(axis=1)]
+
+        pending = pending[~found & (lo + width < hi)]
+        offset += width
+        width = max(
+            _INITIAL_SCAN_WIDTH, min(2 * width, _MAX_SCAN_CELLS // max(len(pending), 1))
+        )
+    return exits
+
+
+def _scan_first_true_per_trade(
     df: pd.DataFrame,
-    trade: pd.Series,
-    exit_condition: Callable[[pd.DataFrame, pd.Series], pd.Series],
-) -> Transaction:
-    exit_indices = df[exit_condition(df, trade)].index
-    if exit_indices.empty:
-        exit_index = df.index[-1]
+    trades: Trades,
+    ids: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    exit_condition: ExitCondition,
+) -> np.ndarray:
+    """Same as `_scan_first_true` for conditions which take one trade at once."""
+    exits = ends - 1
+    for k, (i, start, end) in enumerate(zip(ids, starts, ends)):
+        hit = np.flatnonzero(
+            np.asarray(exit_condition(df.iloc[start:end], trades.get_trade(i)))
+        )
+        if len(hit) != 0:
+            exits[k] = start + hit[0]
+    return exits
+
+
+def _entry_windows(
+    index: pd.DatetimeIndex,
+    entries: Trades,
+    max_holding_time: Optional[pd.Timedelta] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Ids, amounts and the window of rows `[starts, ends)` of each entry."""
+    assert index.is_monotonic_increasing
+
+    ids, timestamps, amounts = _entries(entries)
+    starts = index.searchsorted(timestamps, side="left")
+    if max_holding_time is None:
+        ends = np.full(len(starts), len(index))
     else:
-        exit_index = exit_indices[0]
-    return Transaction(timestamp=exit_index, amount=-trade.sum())
+        ends = index.searchsorted(timestamps + max_holding_time, side="right")
+    assert (starts < ends).all()
+    return ids, amounts, starts, ends
 
 
-def _no_exit_condition(df: pd.DataFrame, trade: pd.Series) -> pd.Series:
-    return pd.Series(index=df.index, data=False)
+def _exit_trades(
+    index: pd.DatetimeIndex,
+    entries: Trades,
+    ids: np.ndarray,
+    amounts: np.ndarray,
+    exit_positions: np.ndarray,
+) -> Trades:
+    """Close the entries at row `exit_positions` and return all the trades."""
+    exits = pd.DataFrame(
+        index=index[exit_positions],
+        data={"amount": -amounts, "_id": ids},
+        columns=["amount", "_id"],
+    )
+    exits = from_dataframe(exits, entries.symbol, entries.currency_unit)
+    return concat([entries, exits])
 
 
-def exit(
-    mkt: MarketData,
-    sig: Optional[Signal],
+def _exit(
+    df: pd.DataFrame,
     entries: Trades,
-    exit_condition: Callable[[pd.DataFrame, pd.Series], pd.Series],
+    exit_condition: Callable,
+    max_holding_time: Optional[pd.Timedelta] = None,
 ) -> Trades:
-    """Exit trade when satisfying condition.
+    """Exit all the entries at once and return entries with their exits."""
+    ids, amounts, starts, ends = _entry_windows(df.index, entries, max_holding_time)
+
+    if _is_vectorized(exit_condition):
+        exit_positions = _scan_first_true(
+            lambda pending, positions: exit_condition(
+                df, starts[pending], amounts[pending], positions
+            ),
+            starts,
+            ends,
+        )
+    else:
+        exit_positions = _scan_first_true_per_trade(
+            df, entries, ids, starts, ends, exit_condition
+        )
+
+    return _exit_trades(df.index, entries, ids, amounts, exit_positions)
+
+
+def _scan_first_stop(
+    prices: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    amounts: np.ndarray,
+    loss_threshold: float,
+    gain_threshold: float,
+    trailing_stop: Optional[float],
+) -> np.ndarray:
+    """Find the first stop loss, take gain or trailing stop of all the entries.
+
+    The historical max pl of each entry is carried over from one block of the
+    scan to the next one, so every price is visited only once per entry.
 
     Args:
-        mkt: Market data
-        sig: Signal data
-        entries: Tuple of entry trades.
-        max_holding_time: maximum holding time
-        exit_condition: The entry is closed most closest time which
-                        condition is `True`.
+        prices: Prices to evaluate pl.
+        starts: Row position of each entry.
+        ends: Row position after the last one to scan for each entry.
+        amounts: Amount of each entry.
+        loss_threshold: Exit when the pl per amount is less than or equal to
+                        `-loss_threshold`.
+        gain_threshold: Exit when the pl per amount is greater than or equal to
+                        `gain_threshold`.
+        trailing_stop: Exit when both the historical max pl per amount and the
+                       drawdown from it are greater than or equal to
+                       `trailing_stop`. `None` to disable it.
     Result:
-        Trades
+        Row positions of the exits.
     """
-    df = _concat(mkt, sig)
+    signs = np.sign(amounts)
+    entry_prices = prices[starts]
+    historical_max_pl = np.full(len(starts), -np.inf)
 
-    def _exit(
-        trades: Trades,
-        df: pd.DataFrame,
-        exit_condition: Callable[[pd.DataFrame, pd.Series], pd.Series],
-    ) -> pd.Series:
+    def _evaluate(pending: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        pl_per_amount = signs[pending, None] * (
+            prices[positions] - entry_prices[pending, None]
+        )
+        is_exit = (pl_per_amount <= -loss_threshold) | (pl_per_amount >= gain_threshold)
 
-        indices = []  # type: List[pd.Timestamp]
-        exits = []  # type: List[Tuple[float, int]]
-        for i in trades.ids:
-            trade = trades.get_trade(i)
-            if trade.sum() == 0:
-                continue
+        if trailing_stop is not None:
+            max_pl = np.maximum.accumulate(pl_per_amount, axis=1)
+            max_pl = np.maximum(max_pl, historical_max_pl[pending, None])
+            historical_max_pl[pending] = max_pl[:, -1]
 
-            idx = trade.index[0]
-            df_exit = df[idx <= df.index]
-            transaction = _exit_transaction(df_exit, trade, exit_condition)
+            drawdown = max_pl - pl_per_amount
+            is_exit |= (max_pl >= trailing_stop) & (drawdown >= trailing_stop)
 
-            indices.append(transaction.timestamp)
-            exits.append((transaction.amount, i))
+        return is_exit
 
-        df = pd.DataFrame(index=indices, data=exits, columns=["amount", "_id"])
+    return _scan_first_true(_evaluate, starts, ends)
 
-        return from_dataframe(df, trades.symbol, trades.currency_unit)
 
-    exits = _exit(entries, df, exit_condition)
-    return concat([entries, exits])
+@vectorized_exit_condition
+def _no_exit_condition(
+    df: pd.DataFrame, starts: np.ndarray, amounts: np.ndarray, positions: np.ndarray
+) -> np.ndarray:
+    return np.zeros(positions.shape, dtype=bool)
+
+
+def exit(
+    mkt: MarketData, sig: Optional[Signal], entries: Trades, exit_condition: Callable
+) -> Trades:
+    """Exit trade when satisfying condition.
+
+    Args:
+        mkt: Market data
+        sig: Signal data
+        entries: Tuple of entry trades.
+        exit_condition: The entry is closed most closest time which
+                        condition is `True`. Either a function taking
+                        one trade or a vectorized exit condition.
+                        See also :func:`vectorized_exit_condition`.
+    Result:
+        Trades
+    """
+    df = _concat(mkt, sig)
+    return _exit(df, entries, exit_condition)
 
 
 def exit_by_max_holding_time(
@@ -91,7 +283,7 @@ def exit_by_max_holding_time(
     sig: Optional[Signal],
     entries: Trades,
     max_holding_time: pd.Timedelta,
-    exit_condition: Callable[[pd.DataFrame, pd.Series], pd.Series],
+    exit_condition: Callable,
 ) -> Trades:
     """Exit trade at max holding time or satisfying condition.
 
@@ -101,37 +293,14 @@ def exit_by_max_holding_time(
         entries: Tuple of entry trades.
         max_holding_time: maximum holding time
         exit_condition: The entry is closed most closest time which
-                        condition is `True`.
+                        condition is `True`. Either a function taking
+                        one trade or a vectorized exit condition.
+                        See also :func:`vectorized_exit_condition`.
     Result:
         Trades
     """
     df = _concat(mkt, sig)
-
-    def _exit_by_max_holding_time(
-        trades: Trades,
-        df: pd.DataFrame,
-        max_holding_time: pd.Timedelta,
-        exit_condition: Callable[[pd.DataFrame, pd.Series], pd.Series],
-    ) -> Trades:
-
-        indices = []  # type: List[pd.Timestamp]
-        exits = []  # type: List[Tuple[float, int]]
-        for i in trades.ids:
-            trade = trades.get_trade(i)
-            if trade.sum() == 0:
-                continue
-
-            idx = trade.index[0]
-            df_exit = df[(idx <= df.index) & (df.index <= idx + max_holding_time)]
-            transaction = _exit_transaction(df_exit, trade, exit_condition)
-            indices.append(transaction.timestamp)
-            exits.append((transaction.amount, i))
-
-        df = pd.DataFrame(index=indices, data=exits, columns=["amount", "_id"])
-        return from_dataframe(df, trades.symbol, trades.currency_unit)
-
-    exits = _exit_by_max_holding_time(entries, df, max_holding_time, exit_condition)
-    return concat([entries, exits])
+    return _exit(df, entries, exit_condition, max_holding_time=max_holding_time)
 
 
 def exit_at_max_holding_time(
@@ -171,15 +340,17 @@ def exit_at_opposite_signals(
         Trades
     """
 
-    def _exit_at_opposite_signals_condition(
-        df: pd.DataFrame, opposite_signals_dict: dict
-    ) -> pd.Series:
-        current_signal = TernaryDirection(df["pred"][0])
-        opposite_signals = opposite_signals_dict[current_signal]
-        return df["pred"].isin(opposite_signals)
-
-    def _exit_condition(df: pd.DataFrame, trade: pd.Series) -> pd.Series:
-        return _exit_at_opposite_signals_condition(df, opposite_signals_dict)
+    @vectorized_exit_condition
+    def _exit_condition(
+        df: pd.DataFrame, starts: np.ndarray, amounts: np.ndarray, positions: np.ndarray
+    ) -> np.ndarray:
+        pred = df["pred"].values
+        current_signals = pred[starts]
+        is_exit = np.zeros(positions.shape, dtype=bool)
+        for direction, opposite_signals in opposite_signals_dict.items():
+            is_current = current_signals == direction.value
+            is_exit[is_current] = np.isin(pred[positions[is_current]], opposite_signals)
+        return is_exit
 
     return exit_by_max_holding_time(
         mkt, sig, entries, max_holding_time, _exit_condition
@@ -200,17 +371,57 @@ def exit_by_expectation(
         Trades
     """
 
-    def _exit_by_expectation_condition(df: pd.DataFrame, trade: pd.Series) -> pd.Series:
-        current_signal = TernaryDirection(df["pred"][0])
-        v = np.array([1.0, 0.0, -1.0])
-        expectation = np.dot(df[["up", "neutral", "down"]].values, v)
-        expectation = current_signal.value * expectation
-        sign = expectation < 0.0
-        return pd.Series(index=df.index, data=sign)
+    df = _concat(mkt, sig)
+    v = np.array([1.0, 0.0, -1.0])
+    expectation = np.dot(df[["up", "neutral", "down"]].values, v)
+
+    @vectorized_exit_condition
+    def _exit_by_expectation_condition(
+        df: pd.DataFrame, starts: np.ndarray, amounts: np.ndarray, positions: np.ndarray
+    ) -> np.ndarray:
+        current_signals = df["pred"].values[starts]
+        return current_signals[:, None] * expectation[positions] < 0.0
+
+    return _exit(
+        df, entries, _exit_by_expectation_condition, max_holding_time=max_holding_time
+    )
+
 
-    return exit_by_max_holding_time(
-        mkt, sig, entries, max_holding_time, _exit_by_expectation_condition
+def exit_by_stops(
+    mkt: MarketData,
+    entries: Trades,
+    max_holding_time: Optional[pd.Timedelta] = None,
+    loss_threshold: float = np.inf,
+    gain_threshold: float = np.inf,
+    trailing_stop: Optional[float] = None,
+) -> Trades:
+    """Exit at the first stop loss, take gain or trailing stop.
+
+    All the entries are simulated at once on the mid prices of the market data.
+    If no stop is hit, the entry is closed at max holding time or at the end of
+    the market data.
+
+    Args:
+        mkt: Market data
+        entries: Tuple of entry trades.
+        max_holding_time: maximum holding time. `None` for no limit.
+        loss_threshold: Stop loss in absolute price.
+        gain_threshold: Take gain in absolute price.
+        trailing_stop: Trailing stop in absolute price. `None` for no trailing stop.
+    Result:
+        Trades
+    """
+    ids, amounts, starts, ends = _entry_windows(mkt.index, entries, max_holding_time)
+    exit_positions = _scan_first_stop(
+        mkt.mid.values,
+        starts,
+        ends,
+        amounts,
+        loss_threshold,
+        gain_threshold,
+        trailing_stop,
     )
+    return _exit_trades(mkt.index, entries, ids, amounts, exit_positions)
 
 
 def exit_by_trailing_stop(
@@ -235,22 +446,9 @@ def exit_by_trailing_stop(
     assert initial_stop >= 0.0
     assert trailing_stop >= 0.0
 
-    def _exit_by_trailing_stop(df: pd.DataFrame, trade: pd.Series) -> pd.Series:
-        prices = df.mid
-
-        amount = trade.sum()
-        entry_price = prices.iloc[0]
-        pl_per_amount = np.sign(amount) * (prices - entry_price)
-        is_initial_stop = pl_per_amount <= -initial_stop
-
-        historical_max_pl = pl_per_amount.cummax()
-        drawdown = historical_max_pl - pl_per_amount
-        is_trailing_stop = (historical_max_pl >= trailing_stop) & (
-            drawdown >= trailing_stop
-        )
-        return is_initial_stop | is_trailing_stop
-
-    return exit(mkt, None, entries, _exit_by_trailing_stop)
+    return exit_by_stops(
+        mkt, entries, loss_threshold=initial_stop, trailing_stop=trailing_stop
+    )
 
 
 def exit_at_loss_and_gain(
@@ -261,17 +459,22 @@ def exit_at_loss_and_gain(
     loss_threshold: float,
     gain_threshold: float,
 ) -> Trades:
-    def _exit_at_loss_and_gain(df: pd.DataFrame, trade: pd.Series) -> pd.Series:
-        prices = df.mid
-
-        amount = trade.sum()
-        entry_price = prices.iloc[0]
+    """Exit at max holding time, stop loss or take gain.
 
-        pl_per_amount = np.sign(amount) * (prices - entry_price)
-        is_stop_loss = pl_per_amount <= -loss_threshold
-        is_take_gain = pl_per_amount >= gain_threshold
-        return is_stop_loss | is_take_gain
-
-    return exit_by_max_holding_time(
-        mkt, None, entries, max_holding_time, _exit_at_loss_and_gain
+    Args:
+        mkt: Market data
+        sig: Signal data. It is not used.
+        entries: Tuple of entry trades.
+        max_holding_time: maximum holding time
+        loss_threshold: Stop loss in absolute price.
+        gain_threshold: Take gain in absolute price.
+    Result:
+        Trades
+    """
+    return exit_by_stops(
+        mkt,
+        entries,
+        max_holding_time=max_holding_time,
+        loss_threshold=loss_threshold,
+        gain_threshold=gain_threshold,
     )
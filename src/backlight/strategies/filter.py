@@ -3,7 +3,8 @@ import numpy as np
 from typing import List, Type
 
 
-from backlight.trades.trades import Trades, from_dataframe
+from backlight.alignment import is_contained
+from backlight.trades.trades import Trades
 from backlight.datasource.marketdata import AskBidMarketData
 
 
@@ -18,23 +19,57 @@ def limit_max_amount(trades: Trades, max_amount: int) -> Trades:
     """
     assert max_amount > 0.0
 
+    amounts = trades["amount"].values
+    codes, unique_ids = pd.factorize(trades["_id"].values)
+
+    # Transactions are accepted as they are until the amount exceeds the limit
+    # for the first time, so the scan can start from there.
+    cumulative_amounts = np.cumsum(amounts)
+    exceeded = np.flatnonzero(np.abs(cumulative_amounts) > max_amount)
+    if len(exceeded) == 0:
+        return trades[np.ones(len(trades), dtype=bool)]
+    start = exceeded[0]
+
+    current_amount = float(cumulative_amounts[start - 1]) if start > 0 else 0.0
+    is_deleted = [False] * len(unique_ids)
+    for code, amount in zip(codes[start:].tolist(), amounts[start:].tolist()):
+
+        if is_deleted[code]:
+            continue
+
+        next_amount = current_amount + amount
+        if abs(next_amount) > max_amount:
+            is_deleted[code] = True
+            continue
+
+        current_amount = next_amount
+
+    return trades[~np.array(is_deleted, dtype=bool)[codes]]
+
+
+def _limit_max_amount_by_iterrows(trades: Trades, max_amount: int) -> Trades:
+    """`limit_max_amount` as implemented before the vectorization, kept as the
+    reference of its tests and benchmark."""
     current_amount = 0.0
     deleted_ids = []  # type: List[int]
     for index, row in trades.iterrows():
-
         if row["_id"] in deleted_ids:
             continue
-
         next_amount = current_amount + row["amount"]
         if abs(next_amount) > max_amount:
             deleted_ids.append(row["_id"])
             continue
-
         current_amount = next_amount
-
     return trades[~trades["_id"].isin(deleted_ids)]
 
 
+def _skip_entries(trades: Trades, is_skipped: np.ndarray) -> Trades:
+    """Drop all the transactions of the trades flagged in `is_skipped`, which is
+    aligned with `trades.entries`."""
+    skipped_ids = trades.entries.index.values[is_skipped]
+    return trades[~trades["_id"].isin(skipped_ids).values]
+
+
 def skip_entry_by_spread(
     trades: Trades, mkt: AskBidMarketData, max_spread: float
 ) -> Trades:
@@ -48,17 +83,14 @@ def skip_entry_by_spread(
         Trades
     """
     assert max_spread >= 0.0
-    assert trades.index.unique().isin(mkt.index).all()
-
-    spread = mkt.spread
-
-    deleted_ids = []  # type: List[int]
-    for i in trades.ids:
-        entry = trades.get_trade(i).index[0]
-        if spread.at[entry] > max_spread:
-            deleted_ids.append(i)
+    assert is_contained(trades.index, mkt.index)
 
-    return trades[~trades["_id"].isin(deleted_ids)]
+    timestamps = pd.DatetimeIndex(trades.entries["timestamp"])
+    rows = mkt.index.get_indexer(timestamps)
+    if (rows < 0).any():  # even when the assertions are disabled
+        raise KeyError("{} not in index".format(list(timestamps[rows < 0])))
+    spread = mkt.spread.values[rows]
+    return _skip_entries(trades, spread > max_spread)
 
 
 def filter_entry_by_time(trades: Trades, unit: str, container_set: tuple) -> Trades:
@@ -72,36 +104,8 @@ def filter_entry_by_time(trades: Trades, unit: str, container_set: tuple) -> Tra
     Returns:
         Trades.
     """
-
-    sort = trades.sort_values("_id")
-
-    df = pd.DataFrame(
-        data=np.zeros((sort.shape[0], 3)), columns=["amount", "_id", "index"]
-    )
-
-    j = 0
-
-    for i in range(0, sort.index.size, 2):
-        entry_index = sort.index[i]
-        exit_index = sort.index[i + 1]
-        if (
-            getattr(entry_index, unit) in container_set
-            or getattr(exit_index, unit) in container_set
-        ):
-            # This code is faster than an iloc.
-            df.at[j, "amount"] = sort.iat[i, 0]
-            df.at[j + 1, "amount"] = sort.iat[i + 1, 0]
-            df.at[j, "_id"] = sort.iat[i, 1]
-            df.at[j + 1, "_id"] = sort.iat[i + 1, 1]
-            df.at[j, "index"] = entry_index
-            df.at[j + 1, "index"] = exit_index
-
-            j += 2
-
-    df = df.iloc[0:j, :].sort_values("index").set_index("index")
-    df.index.name = None
-
-    return from_dataframe(df, trades.symbol, trades.currency_unit)
+    times = getattr(trades.index, unit)
+    return trades.get_any(np.isin(times, list(container_set)))
 
 
 def skip_entry_by_hours(trades: Trades, hours: List[int]) -> Trades:
@@ -113,10 +117,6 @@ def skip_entry_by_hours(trades: Trades, hours: List[int]) -> Trades:
     Result:
         Trades
     """
-    deleted_ids = []
-    for i in trades.ids:
-        entry = trades.get_trade(i).index[0]
-        if entry.hour in hours:
-            deleted_ids.append(i)
-
-    return trades[~trades["_id"].isin(deleted_ids)]
+    entries = trades.entries
+    hour = pd.DatetimeIndex(entries["timestamp"]).hour
+    return _skip_entries(trades, np.isin(hour, list(hours)))
@@ -2,7 +2,7 @@ import pandas as pd
 import numpy as np
 from collections import namedtuple
 from functools import lru_cache
-from typing import Any, Type, List, Iterable, Optional  # noqa
+from typing import Any, Type, List, Iterable, Iterator, Optional, Tuple  # noqa
 from backlight.asset.currency import Currency
 
 from backlight.datasource.marketdata import MarketData
@@ -10,6 +10,38 @@ from backlight.datasource.marketdata import MarketData
 
 Transaction = namedtuple("Transaction", ["timestamp", "amount"])
 
+# Rows grouped by trade id as in the CSR format. The rows of the trade
+# `unique_ids[k]` are `order[offsets[k]:offsets[k + 1]]`, `codes` maps each row
+# to its `k`, and `ids` are the unique ids in the order of their first appearance.
+_TradeIndex = namedtuple(
+    "_TradeIndex", ["unique_ids", "order", "offsets", "codes", "ids"]
+)
+
+
+def _as_slice(rows: np.ndarray) -> Any:
+    """`rows` as a slice if they are contiguous and ascending, since slicing
+    an index keeps its freq and fancy indexing does not."""
+    if len(rows) > 0 and rows[-1] - rows[0] + 1 == len(rows):
+        if len(rows) == 1 or (np.diff(rows) == 1).all():
+            return slice(rows[0], rows[-1] + 1)
+    return rows
+
+
+def _make_trade_index(ids: np.ndarray) -> _TradeIndex:
+    order = np.argsort(ids, kind="mergesort")
+    unique_ids, starts = np.unique(ids[order], return_index=True)
+    offsets = np.append(starts, len(ids))
+    codes = np.empty(len(ids), dtype=int)
+    codes[order] = np.repeat(np.arange(len(unique_ids)), np.diff(offsets))
+    first_rows = order[starts]
+    return _TradeIndex(
+        unique_ids=unique_ids,
+        order=order,
+        offsets=offsets,
+        codes=codes,
+        ids=unique_ids[np.argsort(first_rows, kind="mergesort")].tolist(),
+    )
+
 
 def _max(s: pd.Series) -> int:
     if len(s) == 0:
@@ -30,12 +62,37 @@ class Trades(pd.DataFrame):
 
     _target_columns = ["amount", "_id"]
 
+    # Built on demand and dropped by the writes to the frame. Not in
+    # `_metadata` because it is only valid for the rows of this instance.
+    _trade_index = None  # type: Optional[_TradeIndex]
+
+    def _clear_item_cache(self, *args: Any, **kwargs: Any) -> None:
+        self._trade_index = None
+        super()._clear_item_cache(*args, **kwargs)
+
+    def _set_value(self, *args: Any, **kwargs: Any) -> Any:
+        self._trade_index = None
+        return super()._set_value(*args, **kwargs)
+
+    def _maybe_cache_changed(self, *args: Any, **kwargs: Any) -> None:
+        # Called back on in-place writes to a column through its Series, e.g.
+        # `t["_id"][ts] = v`, which keep the same array.
+        self._trade_index = None
+        super()._maybe_cache_changed(*args, **kwargs)
+
+    def _get_trade_index(self) -> _TradeIndex:
+        index = self._trade_index
+        if index is None:
+            index = _make_trade_index(self["_id"].values)
+            self._trade_index = index
+        return index
+
     @property
     def ids(self) -> List[int]:
         """Return all unique ids"""
         if "_id" not in self.columns:
             return []
-        return self._id.unique().tolist()
+        return list(self._get_trade_index().ids)
 
     @property
     def amount(self) -> pd.Series:
@@ -52,11 +109,71 @@ class Trades(pd.DataFrame):
         Returns:
             Trade of pd.Series.
         """
-        return self.loc[self._id == trade_id, "amount"]
+        index = self._get_trade_index()
+        k = index.unique_ids.searchsorted(trade_id)
+        if k == len(index.unique_ids) or index.unique_ids[k] != trade_id:
+            rows = np.array([], dtype=int)
+        else:
+            rows = _as_slice(index.order[index.offsets[k] : index.offsets[k + 1]])
+        return pd.Series(
+            data=self["amount"].values[rows], index=self.index[rows], name="amount"
+        )
+
+    @property
+    def entries(self) -> pd.DataFrame:
+        """First transaction of each trade.
 
-    def get_any(self, key: Any) -> Type["Trades"]:
-        """Filter trade which match conditions at least one element. Using container_set and gap
-        makes function way faster than using key. 
+        Returns:
+            pd.DataFrame of `timestamp` and `amount`, indexed by sorted trade ids.
+        """
+        index = self._get_trade_index()
+        rows = index.order[index.offsets[:-1]]
+        return pd.DataFrame(
+            data={"timestamp": self.index[rows], "amount": self["amount"].values[rows]},
+            index=pd.Index(index.unique_ids, name="_id"),
+            columns=["timestamp", "amount"],
+        )
+
+    def iter_trades(self) -> Iterator[Tuple[int, pd.Series]]:
+        """Iterate over trades.
+
+        Returns:
+            Iterator of tuples of id and trade, in the same order as `ids`.
+        """
+        if "_id" not in self.columns:
+            return
+
+        index = self._get_trade_index()
+        amount = self["amount"].values
+        for trade_id in index.ids:
+            k = index.unique_ids.searchsorted(trade_id)
+            rows = _as_slice(index.order[index.offsets[k] : index.offsets[k + 1]])
+            yield trade_id, pd.Series(
+                data=amount[rows], index=self.index[rows], name="amount"
+            )
+
+    def _key_mask(self, key: Any) -> np.ndarray:
+        """Boolean mask of the rows selected by `key`."""
+        is_aligned = not isinstance(key, pd.Series) or key.index.equals(self.index)
+        if is_aligned and not isinstance(key, (str, tuple, slice)):
+            mask = np.asarray(key)
+            if mask.dtype == bool and mask.shape == (len(self),):
+                return mask
+
+        rows = self.assign(_row=np.arange(len(self)))[key]["_row"].values
+        mask = np.zeros(len(self), dtype=bool)
+        mask[rows] = True
+        return mask
+
+    def _count_by_id(self, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Count the rows selected by `mask` and all the rows for each id."""
+        index = self._get_trade_index()
+        size = len(index.unique_ids)
+        counts = np.bincount(index.codes, weights=mask, minlength=size)
+        return counts, np.diff(index.offsets)
+
+    def get_any(self, key: Any) -> "Trades":
+        """Filter trade which match conditions at least one element.
 
         Args:
             key: Same arguments with pd.DataFrame.__getitem__
@@ -64,12 +181,10 @@ class Trades(pd.DataFrame):
         Returns:
             Trades.
         """
+        counts, _ = self._count_by_id(self._key_mask(key))
+        return self._select_rows((counts > 0)[self._get_trade_index().codes])
 
-        filterd_ids = self[key].ids
-        trades = [self.get_trade(i) for i in filterd_ids]
-        return make_trades(self.symbol, trades, self.currency_unit, filterd_ids)
-
-    def get_all(self, key: Any) -> Type["Trades"]:
+    def get_all(self, key: Any) -> "Trades":
         """Filter trade which match conditions for all elements.
 
         Args:
@@ -78,15 +193,20 @@ class Trades(pd.DataFrame):
         Returns:
             Trades.
         """
-        filterd = self[key]
-        ids = []
-        trades = []
-        for i in filterd.ids:
-            t = self.get_trade(i)
-            if t.equals(filterd.get_trade(i)):
-                ids.append(i)
-                trades.append(t)
-        return make_trades(self.symbol, trades, self.currency_unit, ids)
+        counts, sizes = self._count_by_id(self._key_mask(key))
+        return self._select_rows((counts == sizes)[self._get_trade_index().codes])
+
+    def _select_rows(self, mask: np.ndarray) -> "Trades":
+        index = self.index[mask]
+        if isinstance(index, pd.DatetimeIndex):
+            index.freq = None  # the selected rows are not a range
+        return from_arrays(
+            index,
+            self["amount"].values[mask],
+            self["_id"].values[mask],
+            self.symbol,
+            self.currency_unit,
+        )
 
     def reset_cols(self) -> None:
         """Keep only _target_columns"""
@@ -103,11 +223,16 @@ def _sum(a: pd.Series) -> float:
     return a.sum() if len(a) != 0 else 0
 
 
-def _sort(t: Trades) -> Trades:
-    t["ind"] = t.index
-    t = t.sort_values(by=["ind", "_id"])
-    t.reset_cols()
-    return t
+def _append(indices: List[pd.Index]) -> pd.Index:
+    if len(indices) == 0:
+        return pd.DatetimeIndex([])
+    return indices[0].append(indices[1:])
+
+
+def _concatenate(arrays: List[np.ndarray]) -> np.ndarray:
+    if len(arrays) == 0:
+        return np.array([], dtype=float)
+    return np.concatenate(arrays)
 
 
 def make_trade(transactions: Iterable[Transaction]) -> pd.Series:
@@ -118,6 +243,46 @@ def make_trade(transactions: Iterable[Transaction]) -> pd.Series:
     return sr.groupby(sr.index).sum().sort_index()
 
 
+def from_arrays(
+    index: pd.Index,
+    amount: np.ndarray,
+    _id: np.ndarray,
+    symbol: str,
+    currency_unit: Currency,
+) -> Trades:
+    """Create a Trades instance out of arrays of transactions
+
+    Args:
+        index: Timestamps of the transactions
+        amount: Amounts of the transactions
+        _id: Ids of the trades which the transactions belong to
+        symbol: symbol of the Trades
+        currency_unit: currency unit of the Trades
+
+    Returns:
+        Trades sorted by timestamp and id
+    """
+    index = pd.Index(index)
+    amount = np.asarray(amount)
+    _id = np.asarray(_id)
+    assert len(index) == len(amount) == len(_id)
+
+    if isinstance(index, pd.DatetimeIndex):
+        order = np.lexsort((_id, index.asi8))
+    else:
+        order = np.lexsort((_id, index.values))
+    order = _as_slice(order)
+
+    trades = Trades(
+        data={"amount": amount[order], "_id": _id[order]},
+        index=index[order],
+        columns=Trades._target_columns,
+    )
+    trades.symbol = symbol
+    trades.currency_unit = currency_unit
+    return trades
+
+
 def from_dataframe(df: pd.DataFrame, symbol: str, currency_unit: Currency) -> Trades:
     """Create a Trades instance out of a DataFrame object
 
@@ -128,13 +293,9 @@ def from_dataframe(df: pd.DataFrame, symbol: str, currency_unit: Currency) -> Tr
     Returns:
         Trades
     """
-
-    trades = Trades(df.copy())
-    trades.symbol = symbol
-    trades.currency_unit = currency_unit
-    trades.reset_cols()
-
-    return _sort(trades)
+    return from_arrays(
+        df.index, df["amount"].values, df["_id"].values, symbol, currency_unit
+    )
 
 
 def concat(trades: List[Trades], refresh_id: bool = False) -> Trades:
@@ -147,20 +308,22 @@ def concat(trades: List[Trades], refresh_id: bool = False) -> Trades:
     Returns:
         Trades
     """
-    if refresh_id:
-        id_offset = 0
-        list_of_trades = []
-        for a_trades in trades:
-            a_trades = a_trades.copy()
-            a_trades._id += id_offset
-            id_offset = a_trades._id.max() + 1
-            list_of_trades.append(a_trades)
-        trades = list_of_trades
-
-    t = Trades(pd.concat(trades, axis=0))
-    t.symbol = trades[0].symbol
-    t.currency_unit = trades[0].currency_unit
-    return _sort(t)
+    ids = []
+    id_offset = 0
+    for a_trades in trades:
+        a_ids = a_trades["_id"].values
+        if refresh_id and len(a_ids) != 0:
+            a_ids = a_ids + id_offset
+            id_offset = a_ids.max() + 1
+        ids.append(a_ids)
+
+    return from_arrays(
+        _append([t.index for t in trades]),
+        _concatenate([t["amount"].values for t in trades]),
+        _concatenate(ids),
+        trades[0].symbol,
+        trades[0].currency_unit,
+    )
 
 
 def make_trades(
@@ -185,12 +348,21 @@ def make_trades(
 
     assert len(_ids) == len(trades)
 
-    df = pd.concat(trades, axis=0).to_frame(name="amount")
-    df.loc[:, "_id"] = 0
-    current = 0
-    for i, t in zip(_ids, trades):
-        l = len(t.index)
-        df.iloc[current : current + l, 1] = i
-        current += l
-
-    return from_dataframe(df, symbol, currency_unit)
+    lengths = [len(t.index) for t in trades]
+    if len(_ids) == 0:
+        id_array = np.array([], dtype=int)
+    elif all(np.ndim(i) == 0 for i in _ids):
+        id_array = np.repeat(np.asarray(_ids), lengths)
+    else:
+        # ids can also be given for each transaction of the trades
+        id_array = np.concatenate(
+            [np.broadcast_to(i, (l,)) for i, l in zip(_ids, lengths)]
+        )
+
+    return from_arrays(
+        _append([t.index for t in trades]),
+        _concatenate([t.values for t in trades]),
+        id_array,
+        symbol,
+        currency_unit,
+    )
@@ -0,0 +1,53 @@
+from backlight.alignment import alignment as module
+import pytest
+import pandas as pd
+
+
+@pytest.fixture
+def index():
+    return pd.date_range(start="2018-06-06", freq="1min", periods=10)
+
+
+@pytest.mark.parametrize(
+    "positions, expected",
+    [
+        ([], True),
+        ([0, 3, 9], True),
+        ([3, 3, 5], True),
+        ([5, 1], True),
+        (slice(None), True),
+    ],
+)
+def test_is_contained(index, positions, expected):
+    assert module.is_contained(index[positions], index) == expected
+
+
+@pytest.mark.parametrize(
+    "sub",
+    [
+        pd.DatetimeIndex(["2018-06-05 23:59:00"]),
+        pd.DatetimeIndex(["2018-06-06 00:00:30"]),
+        pd.DatetimeIndex(["2018-06-06 00:10:00"]),
+        pd.DatetimeIndex(["2018-06-06 00:10:00", "2018-06-06 00:01:00"]),
+    ],
+)
+def test_is_contained_with_missing_labels(index, sub):
+    assert not module.is_contained(sub, index)
+    assert not module.is_contained(index, index[:0])
+
+
+def test_is_contained_cache(index, mocker):
+    sub = index[[1, 2]]
+    spy = mocker.spy(module, "_is_contained")
+    assert module.is_contained(sub, index)
+    assert module.is_contained(sub, index)
+    assert spy.call_count == 1
+    assert module.is_contained(index[[1, 2]], index)
+    assert spy.call_count == 2
+
+
+def test_trusted_inputs(index):
+    sub = pd.DatetimeIndex(["2018-06-07"])
+    with module.trusted_inputs():
+        assert module.is_contained(sub, index)
+    assert not module.is_contained(sub, index)
@@ -56,3 +56,31 @@ def test_mid2askbid():
     assert mkt.currency_unit == currency_unit
     assert (mkt.ask == expected.ask).all()
     assert (mkt.bid == expected.bid).all()
+
+
+def test_iter_marketdata(tmpdir):
+    symbol = "USDJPY"
+    currency_unit = Currency.JPY
+    df = pd.DataFrame(
+        index=pd.date_range(start="2018-06-06", freq="1min", periods=10),
+        data=[[i, i + 2] for i in range(10)],
+        columns=["ask", "bid"],
+    )
+    df.index.name = "timestamp"
+    path = str(tmpdir.join("USDJPY.csv"))
+    df.to_csv(path)
+
+    mkts = list(
+        module.iter_marketdata(
+            symbol,
+            df.index[1],
+            df.index[8],
+            "file://" + path,
+            currency_unit,
+            chunksize=3,
+        )
+    )
+    assert [len(mkt) for mkt in mkts] == [2, 3, 3]
+    assert all(mkt.symbol == symbol for mkt in mkts)
+    assert all(mkt.currency_unit == currency_unit for mkt in mkts)
+    assert list(mkts[0].mid.values) == [2, 3]
@@ -1,4 +1,5 @@
 from backlight.datasource import marketdata as module
+import pytest
 import pandas as pd
 
 
@@ -33,3 +34,60 @@ def test_MidMarketData():
     )
     md = module.MidMarketData(df)
     assert all(md.mid.values == [0, 2, 6])
+
+
+def test_AskBidMarketData_fee():
+    df = pd.DataFrame(
+        index=pd.date_range(start="2018-06-06", periods=3),
+        data=[[2, 0], [4, 2], [6, 4]],
+        columns=["ask", "bid"],
+    )
+    md = module.AskBidMarketData(df)
+    amount = pd.Series(data=[1.0, 0.0, -2.0], index=df.index)
+    expected = pd.Series(data=[2.0, 0.0, -8.0], index=df.index)
+    pd.testing.assert_series_equal(md.fee(amount), expected)
+
+    fees = md.fees([amount, amount.iloc[1:], amount.iloc[:0]])
+    pd.testing.assert_series_equal(fees[0], expected)
+    pd.testing.assert_series_equal(fees[1], expected.iloc[1:])
+    assert len(fees[2]) == 0
+
+    with pytest.raises(KeyError):
+        md.fee(pd.Series(data=[1.0], index=[pd.Timestamp("2018-06-10")]))
+
+
+def test_AskBidMarketData_derived_columns():
+    df = pd.DataFrame(
+        index=pd.date_range(start="2018-06-06", periods=3),
+        data=[[2, 0], [4, 2], [6, 4]],
+        columns=["ask", "bid"],
+    )
+    md = module.AskBidMarketData(df)
+    assert md.mid.values is md.mid.values
+    assert md.spread.dtype == "float64"
+    assert all(md.iloc[1:].mid.values == [3, 5])
+
+    md.iat[0, 0] = 4
+    assert all(md.mid.values == [2, 3, 5])
+    md.loc[md.index[1], "bid"] = 0
+    assert all(md.spread.values == [4, 4, 2])
+    md["ask"] = 6
+    assert all(md.mid.values == [3, 3, 5])
+
+
+def test_AskBidMarketData_derived_columns_series_writes():
+    df = pd.DataFrame(
+        index=pd.date_range(start="2018-06-06", periods=3),
+        data=[[2.0, 0.0], [4.0, 2.0], [6.0, 4.0]],
+        columns=["ask", "bid"],
+    )
+    md = module.AskBidMarketData(df)
+    assert all(md.mid.values == [1, 3, 5])
+
+    ask = md["ask"]
+    ask[md.index[0]] = 4.0
+    assert all(md.mid.values == [2, 3, 5])
+    ask.where(ask < 6.0, 8.0, inplace=True)
+    assert all(md.mid.values == [2, 3, 6])
+    md["bid"].iloc[1] = 0.0
+    assert all(md.spread.values == [4, 4, 4])
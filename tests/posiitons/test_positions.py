@@ -166,3 +166,26 @@ def test_calculate_positions_bfill(trades, mid):
     expected = module.Positions(df)
     positions = module.calculate_positions(trades, mid.resample("30s").ffill())
     pd.testing.assert_frame_equal(positions, expected)
+
+
+@pytest.mark.parametrize("market", ["mid", "askbid"])
+def test_incremental_positions(trades, market, request):
+    mkt = request.getfixturevalue(market)
+    positions = module.IncrementalPositions(principal=1.0, capacity=2)
+    for i in range(len(mkt)):
+        bars = mkt.iloc[i : i + 1]
+        positions.update(bars, trades[trades.index.isin(bars.index)])
+
+    expected = module.calculate_positions(trades, mkt, principal=1.0)
+    pd.testing.assert_frame_equal(positions.positions, expected)
+    assert positions.positions.symbol == expected.symbol
+
+
+def test_incremental_positions_without_bars(trades, mid):
+    positions = module.IncrementalPositions(principal=1.0)
+    positions.update(mid.iloc[:0], trades.iloc[:0])
+    positions.update(mid, trades)
+    positions.update(mid.iloc[:0], trades.iloc[:0])
+
+    expected = module.calculate_positions(trades, mid, principal=1.0)
+    pd.testing.assert_frame_equal(positions.positions, expected)
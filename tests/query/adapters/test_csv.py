@@ -26,6 +26,16 @@ def test_CSVAdapter(df):
         assert df.equals(res)
 
 
+def test_CSVAdapter_relative_path(tmpdir, df):
+    df.index.freq = None  # not stored in csv files
+    df.to_csv(str(tmpdir.join("hoge.csv")))
+
+    with tmpdir.as_cwd():
+        m = module.CSVAdapter(url="file://hoge.csv")
+        res = m.query("ABC", "2018-06-07", "2018-06-10")
+    pd.testing.assert_frame_equal(res, df.iloc[1:])
+
+
 def test_S3CSVAdapter(df):
     path = "hoge-path/fuba.csv"
     bucket = "buzz-bucket"
@@ -41,3 +51,105 @@ def test_S3CSVAdapter(df):
         res = m.query("ABC", "2018-06-06", "2018-06-10")
         mocked_client.get_object.assert_called_with(Bucket=bucket, Key=path)
         assert df.equals(res)
+
+
+@pytest.fixture
+def minutes():
+    df = pd.DataFrame(
+        index=pd.date_range(start="2018-06-06", freq="1min", periods=100),
+        data=[[i + 1.0, float(i)] for i in range(100)],
+        columns=["ask", "bid"],
+    )
+    df.index.name = "timestamp"
+    df.index.freq = None  # not stored in csv files
+    return df
+
+
+def test_read_csv_in_range(tmpdir, minutes, monkeypatch, mocker):
+    monkeypatch.setattr(module, "_MIN_RANGE_READ_SIZE", 0)
+    path = str(tmpdir.join("hoge.csv"))
+    minutes.to_csv(path)
+    start_dt, end_dt = minutes.index[10], minutes.index[20]
+
+    res = module.read_csv_in_range(path, start_dt, end_dt)
+    pd.testing.assert_frame_equal(res, minutes.iloc[10:21])
+    assert not module.is_csv_outside(path, start_dt, end_dt)
+    assert module.is_csv_outside(path, "2018-06-07", "2018-06-08")
+
+    spy = mocker.spy(module, "_read_range")
+    for s, e in [(start_dt, end_dt), ("2018-06-05", start_dt), (end_dt, "2018-06-07")]:
+        res = module.read_csv_in_range(path, s, e)
+        pd.testing.assert_frame_equal(res, minutes[s:e])
+    assert spy.call_count == 3
+
+    minutes.iloc[::-1].to_csv(path)
+    res = module.read_csv_in_range(path, start_dt, end_dt)
+    pd.testing.assert_frame_equal(res, minutes.iloc[10:21])
+    assert spy.call_count == 3
+
+
+def test_read_csv_and_set_index_unnamed(tmpdir, minutes):
+    path = str(tmpdir.join("hoge.csv"))
+    minutes.rename_axis(None).to_csv(path)
+
+    res = module.read_csv_and_set_index(path)
+    pd.testing.assert_frame_equal(res, minutes.rename_axis(None))
+
+
+def test_iter_csv_in_range(tmpdir, minutes, mocker):
+    path = str(tmpdir.join("hoge.csv"))
+    minutes.iloc[::-1].to_csv(path)
+    start_dt, end_dt = minutes.index[10], minutes.index[50]
+
+    chunks = list(module.iter_csv_in_range(path, start_dt, end_dt, 30))
+    assert [len(c) for c in chunks] == [11, 30]
+    pd.testing.assert_frame_equal(chunks[0], minutes.iloc[40:51])
+
+    minutes.to_csv(path)
+    module.read_csv_in_range(path, start_dt, end_dt)  # records the span
+    spy = mocker.spy(module, "_search")
+    m = module.CSVAdapter("file://" + path)
+    chunks = list(m.iter_query("ABC", start_dt, end_dt, 30))
+    assert [len(c) for c in chunks] == [30, 11]
+    pd.testing.assert_frame_equal(pd.concat(chunks), minutes.iloc[10:51])
+    assert spy.call_count == 1
+    assert list(m.iter_query("ABC", "2018-06-07", "2018-06-08", 30)) == []
+
+
+def test_iter_csv_in_range_unnamed(tmpdir, minutes):
+    path = str(tmpdir.join("hoge.csv"))
+    minutes = minutes.rename_axis(None)
+    minutes.to_csv(path)
+    module.read_csv_in_range(path, minutes.index[0], minutes.index[1])
+
+    chunks = list(
+        module.iter_csv_in_range(path, minutes.index[5], minutes.index[-1], 50)
+    )
+    assert [len(c) for c in chunks] == [50, 45]
+    pd.testing.assert_frame_equal(pd.concat(chunks), minutes.iloc[5:])
+
+
+@pytest.mark.parametrize("engine", ["c", "pyarrow"])
+def test_read_csv_and_set_index_with_options(tmpdir, minutes, engine, mocker):
+    if engine == "pyarrow":
+        pytest.importorskip("pyarrow.csv")
+    path = str(tmpdir.join("hoge.csv"))
+    minutes.to_csv(path, date_format="%Y/%m/%d %H:%M:%S")
+
+    options = module.CSVOptions(
+        dtype="float32", timestamp_format="%Y/%m/%d %H:%M:%S", engine=engine
+    )
+    sort_index = mocker.spy(pd.DataFrame, "sort_index")
+    res = module.read_csv_and_set_index(path, options)
+    pd.testing.assert_frame_equal(res, minutes.astype("float32"))
+    assert sort_index.call_count == 0
+
+    epochs = minutes.set_index(minutes.index.astype("int64") // 10 ** 9)
+    epochs.iloc[::-1].to_csv(path)
+    options = module.CSVOptions(
+        dtype={"ask": "float32"}, timestamp_unit="s", engine=engine
+    )
+    res = module.read_csv_and_set_index(path, options)
+    expected = minutes.astype({"ask": "float32"})
+    pd.testing.assert_frame_equal(res, expected)
+    assert sort_index.call_count == 1
@@ -91,3 +91,137 @@ def test_S3CSVGlobAdapter_when_empty(df):
         m = module.S3CSVGlobAdapter(url=url)
         res = m.query(symbol, "2018-06-06", "2018-06-10")
         assert res.equals(pd.DataFrame())
+
+
+def test_CSVGlobAdapter_skips_files_outside(tmpdir, mocker):
+    index = pd.date_range(start="2018-06-06", freq="1H", periods=72)
+    df = pd.DataFrame(index=index, data={"ask": 1.0, "bid": 0.0})
+    df.index.freq = None  # not stored in csv files
+    for day in ["06", "07", "08"]:
+        df["2018-06-{}".format(day)].to_csv(str(tmpdir.join("ABC_{}.csv".format(day))))
+    url = "file://" + str(tmpdir.join("*.csv"))
+
+    m = module.CSVGlobAdapter(url=url)
+    expected = m.query("ABC", "2018-06-07 12:00", "2018-06-08 03:00")
+    spy = mocker.spy(module, "read_csv_in_range")
+    res = m.query("ABC", "2018-06-07 12:00", "2018-06-08 03:00")
+    assert spy.call_count == 2
+    pd.testing.assert_frame_equal(res, expected)
+    pd.testing.assert_frame_equal(res, df["2018-06-07 12:00":"2018-06-08 03:00"])
+
+
+def test_CSVGlobAdapter_skips_span_files(tmpdir):
+    index = pd.date_range(start="2018-06-06", freq="1H", periods=48)
+    df = pd.DataFrame(index=index, data={"ask": 1.0, "bid": 0.0})
+    df.index.freq = None  # not stored in csv files
+    for day in ["06", "07"]:
+        df["2018-06-{}".format(day)].to_csv(str(tmpdir.join("ABC_{}".format(day))))
+    url = "file://" + str(tmpdir.join("*"))
+
+    m = module.CSVGlobAdapter(url=url)
+    expected = df["2018-06-06 12:00":"2018-06-07 03:00"]
+    pd.testing.assert_frame_equal(
+        m.query("ABC", "2018-06-06 12:00", "2018-06-07 03:00"), expected
+    )
+    assert len(tmpdir.listdir()) == 4  # with their span files
+    pd.testing.assert_frame_equal(
+        m.query("ABC", "2018-06-06 12:00", "2018-06-07 03:00"), expected
+    )
+
+
+def test_CSVGlobAdapter_iter_query(tmpdir):
+    index = pd.date_range(start="2018-06-06", freq="1H", periods=72)
+    df = pd.DataFrame(index=index, data={"ask": 1.0, "bid": 0.0})
+    df.index.freq = None  # not stored in csv files
+    for day in ["08", "07", "06"]:
+        df["2018-06-{}".format(day)].to_csv(str(tmpdir.join("ABC_{}.csv".format(day))))
+    url = "file://" + str(tmpdir.join("*.csv"))
+
+    m = module.CSVGlobAdapter(url=url)
+    chunks = list(m.iter_query("ABC", "2018-06-06 12:00", "2018-06-08 03:00", 10))
+    assert [len(c) for c in chunks] == [8, 4, 10, 10, 4, 4]
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks), df["2018-06-06 12:00":"2018-06-08 03:00"]
+    )
+
+
+class FileSystemS3Client:
+    """S3 client serving the files under a local directory, with small pages."""
+
+    def __init__(self, root, page_size=2):
+        self._root = root
+        self._page_size = page_size
+        self.list_calls = 0
+
+    def list_objects_v2(self, Bucket, Prefix, ContinuationToken="0"):
+        self.list_calls += 1
+        bucket = self._root.join(Bucket)
+        keys = sorted(
+            p.relto(bucket) for p in bucket.visit() if p.isfile() and p.relto(bucket)
+        )
+        keys = [k for k in keys if k.startswith(Prefix)]
+        start = int(ContinuationToken)
+        end = start + self._page_size
+        response = {"IsTruncated": end < len(keys)}
+        if start < len(keys):
+            response["Contents"] = [{"Key": k} for k in keys[start:end]]
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = str(end)
+        return response
+
+    def get_object(self, Bucket, Key):
+        return {"Body": self._root.join(Bucket, Key).open("rb")}
+
+
+def test_S3CSVGlobAdapter_with_fake_client(tmpdir):
+    index = pd.date_range(start="2018-06-06", freq="1H", periods=120)
+    df = pd.DataFrame(index=index, data={"ask": 1.0, "bid": 0.0})
+    df.index.freq = None  # not stored in csv files
+    directory = tmpdir.join("buzz-bucket", "hoge-path").ensure(dir=True)
+    for day in ["06", "07", "08", "09", "10"]:
+        path = str(directory.join("ABC_{}.csv.gz".format(day)))
+        df["2018-06-{}".format(day)].to_csv(path, compression="gzip")
+    directory.join("DEF_06.csv.gz").write("")
+    client = FileSystemS3Client(tmpdir)
+
+    with mock.patch.object(module.S3CSVGlobAdapter, "_s3client", client):
+        m = module.S3CSVGlobAdapter(url="s3://buzz-bucket/hoge-path/*.csv.gz")
+        res = m.query("ABC", "2018-06-07", "2018-06-09 12:00")
+        pd.testing.assert_frame_equal(res, df["2018-06-07":"2018-06-09 12:00"])
+        assert len(m.timings) == 5
+        assert client.list_calls == 3
+
+        m.query("ABC", "2018-06-07", "2018-06-09 12:00")
+        assert client.list_calls == 3
+
+
+def test_S3CSVGlobAdapter_client_pool(monkeypatch):
+    cls = module.S3CSVGlobAdapter
+    monkeypatch.setattr(cls, "_s3client", None)
+    monkeypatch.setattr(cls, "_s3client_connections", module.DEFAULT_MAX_WORKERS)
+    with mock.patch("backlight.query.adapters.csv_glob.make_s3client") as make:
+        make.side_effect = lambda **config: mock.Mock()
+        client = cls._get_s3client(1)
+        make.assert_called_with(max_pool_connections=module.DEFAULT_MAX_WORKERS)
+        assert cls._get_s3client(module.DEFAULT_MAX_WORKERS) is client
+
+        larger = cls._get_s3client(module.DEFAULT_MAX_WORKERS + 8)
+        assert larger is not client
+        make.assert_called_with(max_pool_connections=module.DEFAULT_MAX_WORKERS + 8)
+        assert cls._get_s3client(1) is larger
+
+
+def test_list_s3_keys_with_cache_size(tmpdir, monkeypatch):
+    monkeypatch.setattr(module, "LISTING_CACHE_SIZE", 2)
+    monkeypatch.setattr(module, "_listing_cache", module.OrderedDict())
+    for prefix in ["a", "b", "c"]:
+        tmpdir.join("buzz-bucket", prefix + ".csv").ensure()
+    client = FileSystemS3Client(tmpdir)
+
+    for prefix in ["a", "b", "c"]:
+        keys = module._list_s3_keys_with_cache(client, "buzz-bucket", prefix, 60.0)
+        assert keys == [prefix + ".csv"]
+    assert list(module._listing_cache) == [("buzz-bucket", "b"), ("buzz-bucket", "c")]
+
+    module._list_s3_keys_with_cache(client, "buzz-bucket", "c", 60.0)
+    assert client.list_calls == 3
@@ -0,0 +1,35 @@
+from backlight.query.adapters import h5 as module
+import pandas as pd
+import pytest
+
+pytest.importorskip("tables")
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame(
+        index=pd.date_range(start="2018-06-06", freq="1min", periods=10),
+        data=[[i + 1.0, float(i)] for i in range(10)],
+        columns=["ask", "bid"],
+    )
+
+
+@pytest.fixture(params=["table", "fixed"])
+def url(request, tmpdir, df):
+    path = str(tmpdir.join("hoge.h5"))
+    df.to_hdf(path, "USDJPY", format=request.param)
+    df.to_hdf(path, "EURJPY", format=request.param)
+    return "file://" + path
+
+
+def test_H5Adapter(url, df):
+    m = module.H5Adapter(url=url)
+    res = m.query("USDJPY", "2018-06-06 00:02:00", "2018-06-06 00:05:00")
+    pd.testing.assert_frame_equal(res, df.iloc[2:6])
+
+
+def test_H5Adapter_iter_query(url, df):
+    m = module.H5Adapter(url=url)
+    chunks = list(m.iter_query("USDJPY", df.index[1], df.index[8], chunksize=3))
+    assert [len(c) for c in chunks] == [3, 3, 2]
+    pd.testing.assert_frame_equal(pd.concat(chunks), df.iloc[1:9])
@@ -1,5 +1,6 @@
 from backlight.query.adapters import merge as module
 from unittest import mock
+import pytest
 import pandas as pd
 
 
@@ -24,3 +25,57 @@ def test_MergeAdapter():
         s3_query.assert_called_with("ABC", "2018-06-06", "2018-06-10")
         expected = pd.concat([df, df], axis=0).sort_index()
         assert res.equals(expected)
+
+
+@pytest.mark.parametrize(
+    "duplicates, expected",
+    [
+        (None, [0.0, 1.0, 2.0, 2.0, 3.0, 3.0, 4.0]),
+        ("first", [0.0, 1.0, 2.0, 3.0, 4.0]),
+        ("last", [0.0, 1.0, 2.0, 3.0, 4.0]),
+    ],
+)
+def test_MergeAdapter_duplicates(duplicates, expected):
+    index = pd.date_range(start="2018-06-06", periods=5)
+    archive = pd.DataFrame(index=index[:4], data={"mid": [0.0, 1.0, 2.0, 3.0]})
+    recent = pd.DataFrame(index=index[2:], data={"mid": [2.0, 3.0, 4.0]})
+    source = "archive" if duplicates != "last" else "recent"
+
+    urls = ["file://hoge.csv", "s3://huga.csv"]
+    with mock.patch(
+        "backlight.query.adapters.csv.CSVAdapter.query"
+    ) as csv_query, mock.patch(
+        "backlight.query.adapters.csv.S3CSVAdapter.query"
+    ) as s3_query:
+        csv_query.return_value = archive.assign(source="archive")
+        s3_query.return_value = recent.assign(source="recent")
+        m = module.MergeAdapter(urls, duplicates=duplicates)
+        res = m.query("ABC", "2018-06-06", "2018-06-10")
+
+    assert res.mid.tolist() == expected
+    assert res.index.is_monotonic_increasing
+    if duplicates is not None:
+        assert (res.source[index[2:4]] == source).all()
+    else:
+        assert res.source.tolist()[2:6] == ["archive", "recent"] * 2
+
+
+@pytest.mark.parametrize("duplicates", ["first", "last"])
+def test_MergeAdapter_duplicates_within_source(duplicates):
+    index = pd.DatetimeIndex(["2018-06-06", "2018-06-07", "2018-06-07", "2018-06-08"])
+    archive = pd.DataFrame(index=index, data={"mid": [0.0, 1.0, 1.5, 2.0]})
+    recent = pd.DataFrame(index=index[3:], data={"mid": [3.0]})
+
+    urls = ["file://hoge.csv", "s3://huga.csv"]
+    with mock.patch(
+        "backlight.query.adapters.csv.CSVAdapter.query"
+    ) as csv_query, mock.patch(
+        "backlight.query.adapters.csv.S3CSVAdapter.query"
+    ) as s3_query:
+        csv_query.return_value = archive
+        s3_query.return_value = recent
+        m = module.MergeAdapter(urls, duplicates=duplicates)
+        res = m.query("ABC", "2018-06-06", "2018-06-10")
+
+    last = 2.0 if duplicates == "first" else 3.0
+    assert res.mid.tolist() == [0.0, 1.0, 1.5, last]
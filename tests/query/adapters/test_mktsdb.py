@@ -1,9 +1,17 @@
 from backlight.query.adapters import mktsdb as module
 from unittest import mock
 import pandas as pd
+import pytest
 import os
 
 
+@pytest.fixture(autouse=True)
+def clients():
+    module._clients.clear()
+    yield
+    module._clients.clear()
+
+
 @mock.patch.dict(os.environ, {"TICK_MARKETSTORE_HOST": "8888"})
 def test_MarketstoreAdapter():
     df = pd.DataFrame(
@@ -21,3 +29,77 @@ def test_MarketstoreAdapter():
             symbol="ABC", timeframe="1Min", end_dt="2018-06-10", start_dt="2018-06-06"
         )
         assert df.equals(res)
+
+
+def test_MarketstoreAdapter_shares_clients():
+    with mock.patch("backlight.query.adapters.mktsdb.client") as mocked:
+        m1 = module.MarketstoreAdapter(url="mktsdb://localhost:5993")
+        m2 = module.MarketstoreAdapter(url="mktsdb://localhost:5993")
+        module.MarketstoreAdapter(url="mktsdb://localhost:5994")
+        assert m1._cli is m2._cli
+        assert mocked.Client.call_count == 2
+        mocked.Client.assert_called_with(host="localhost", port=5994)
+
+
+def test_MarketstoreAdapter_query_many():
+    dfs = {
+        s: pd.DataFrame(
+            index=pd.date_range(start="2018-06-06", periods=3),
+            data=[[i, i + 2]] * 3,
+            columns=["ask", "bid"],
+        )
+        for i, s in enumerate(["ABC", "DEF"])
+    }
+
+    with mock.patch("backlight.query.adapters.mktsdb.client") as mocked, mock.patch(
+        "backlight.query.adapters.mktsdb.time.sleep"
+    ):
+        cli = mocked.Client()
+        failures = [ConnectionError()]
+
+        def query(symbol, **kwargs):
+            if symbol == "DEF" and len(failures) > 0:
+                raise failures.pop()
+            return dfs[symbol]
+
+        cli.query.side_effect = query
+        m = module.MarketstoreAdapter(url=None)
+        res = m.query_many(["ABC", "DEF", "ABC"], "2018-06-06", "2018-06-10")
+        assert list(res.keys()) == ["ABC", "DEF"]
+        assert res["ABC"].equals(dfs["ABC"])
+        assert res["DEF"].equals(dfs["DEF"])
+        assert cli.query.call_count == 3
+
+        cli.query.side_effect = ConnectionError()
+        m = module.MarketstoreAdapter(url=None, retries=2)
+        with pytest.raises(ConnectionError):
+            m.query("ABC", "2018-06-06", "2018-06-10")
+
+
+def test_MarketstoreAdapter_retries():
+    with mock.patch("backlight.query.adapters.mktsdb.client") as mocked, mock.patch(
+        "backlight.query.adapters.mktsdb.time.sleep"
+    ) as sleep:
+        cli = mocked.Client()
+        cli.query.side_effect = TimeoutError()
+        m = module.MarketstoreAdapter(url=None)
+        with pytest.raises(TimeoutError):
+            m.query("ABC", "2018-06-06", "2018-06-10")
+        assert cli.query.call_count == module.DEFAULT_RETRIES
+        intervals = [c[0][0] for c in sleep.call_args_list]
+        assert intervals == [
+            min(module.RETRY_INTERVAL * 2 ** i, module.MAX_RETRY_INTERVAL)
+            for i in range(module.DEFAULT_RETRIES - 1)
+        ]
+
+        cli.query.reset_mock()
+        cli.query.side_effect = ValueError()
+        with pytest.raises(ValueError):
+            m.query("ABC", "2018-06-06", "2018-06-10")
+        assert cli.query.call_count == 1
+
+        cli.query.reset_mock()
+        m = module.MarketstoreAdapter(url=None, retries=0)
+        with pytest.raises(ValueError):
+            m.query("ABC", "2018-06-06", "2018-06-10")
+        assert cli.query.call_count == 0
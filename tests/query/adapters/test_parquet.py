@@ -0,0 +1,66 @@
+from backlight.query.adapters import parquet as module
+import pandas as pd
+import pytest
+
+from backlight.query.common import adapter_factory
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+pytest.importorskip("pyarrow.dataset")
+
+
+@pytest.fixture
+def df():
+    df = pd.DataFrame(
+        index=pd.date_range(start="2018-06-06", freq="1min", periods=10),
+        data=[[i + 1.0, float(i), "USDJPY" if i % 2 else "EURJPY"] for i in range(10)],
+        columns=["ask", "bid", "symbol"],
+    )
+    df.index.name = "timestamp"
+    df.index.freq = None  # not stored in the files
+    return df
+
+
+def test_ParquetAdapter(tmpdir, df):
+    path = str(tmpdir.join("hoge.parquet"))
+    df[["ask", "bid"]].to_parquet(path)
+    url = "file://" + path
+
+    m = adapter_factory(url, columns=["ask"])
+    assert isinstance(m, module.ParquetAdapter)
+    res = m.query("USDJPY", "2018-06-06 00:02:00", "2018-06-06 00:05:00")
+    pd.testing.assert_frame_equal(res, df.iloc[2:6][["ask"]])
+
+
+def test_ParquetAdapter_partitioned(tmpdir, df):
+    path = str(tmpdir.join("hoge.parquet"))
+    pq.write_to_dataset(pa.Table.from_pandas(df), path, partition_cols=["symbol"])
+    url = "file://" + path + "/"
+
+    m = adapter_factory(url)
+    res = m.query("USDJPY", "2018-06-06 00:02:00", "2018-06-06 00:30:00")
+    expected = df[df.symbol == "USDJPY"].iloc[1:][["ask", "bid"]]
+    pd.testing.assert_frame_equal(res, expected)
+
+
+def test_ParquetAdapter_iter_query(tmpdir, df):
+    path = str(tmpdir.join("hoge.parquet"))
+    df.to_parquet(path, row_group_size=4)
+    url = "file://" + path
+
+    m = adapter_factory(url)
+    chunks = list(
+        m.iter_query("USDJPY", "2018-06-06 00:02:00", "2018-06-06 00:30:00", 1)
+    )
+    assert [len(c) for c in chunks] == [1, 1, 1, 1]
+    expected = df[df.symbol == "USDJPY"].iloc[1:][["ask", "bid"]]
+    pd.testing.assert_frame_equal(pd.concat(chunks), expected)
+
+
+def test_ParquetAdapter_relative_path(tmpdir, df):
+    df[["ask", "bid"]].to_parquet(str(tmpdir.join("hoge.parquet")))
+
+    with tmpdir.as_cwd():
+        m = adapter_factory(["file://hoge.parquet"], columns=["bid"])
+        res = m.query("USDJPY", "2018-06-06 00:02:00", "2018-06-06 00:05:00")
+    pd.testing.assert_frame_equal(res, df.iloc[2:6][["bid"]])
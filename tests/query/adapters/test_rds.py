@@ -0,0 +1,56 @@
+from backlight.query.adapters import rds as module
+import pandas as pd
+import pytest
+
+sa = pytest.importorskip("sqlalchemy")
+
+
+@pytest.fixture
+def df():
+    df = pd.DataFrame(
+        index=pd.date_range(start="2018-06-06", freq="1min", periods=10, name="time"),
+        data=[[i + 1.0, float(i)] for i in range(10)],
+        columns=["ask", "bid"],
+    )
+    df.index.freq = None  # not stored in the database
+    return df
+
+
+@pytest.fixture
+def url(tmpdir, df):
+    path = str(tmpdir.join("hoge.sqlite"))
+    engine = sa.create_engine("sqlite:///" + path)
+    ticks = pd.concat([df.assign(sym="USDJPY"), df.assign(sym="EURJPY", ask=0.0)])
+    ticks.sample(frac=1, random_state=0).to_sql("ticks", engine)
+    engine.dispose()
+    return "rds+sqlite:///{}?table=ticks&time=time&symbol=sym".format(path)
+
+
+@pytest.mark.parametrize("chunksize", [3, 100])
+def test_RDSAdapter(url, df, chunksize):
+    m = module.RDSAdapter(url, chunksize=chunksize)
+    res = m.query("USDJPY", "2018-06-06 00:02:00", "2018-06-06 00:05:00")
+    pd.testing.assert_frame_equal(res, df.iloc[2:6])
+
+
+def test_RDSAdapter_empty(url, df):
+    m = module.RDSAdapter(url)
+    res = m.query("GBPJPY", "2018-06-06 00:02:00", "2018-06-06 00:05:00")
+    assert len(res) == 0
+    assert list(res.columns) == ["ask", "bid"]
+
+
+def test_RDSAdapter_iter_query(url, df):
+    m = module.RDSAdapter(url)
+    chunks = list(m.iter_query("USDJPY", df.index[1], df.index[8], 3))
+    assert [len(c) for c in chunks] == [3, 3, 2]
+    pd.testing.assert_frame_equal(pd.concat(chunks), df.iloc[1:9])
+    assert list(m.iter_query("GBPJPY", df.index[1], df.index[8], 3)) == []
+
+
+def test_RDSAdapter_reflects_once(url, df, mocker):
+    m = module.RDSAdapter(url)
+    m.query("USDJPY", df.index[1], df.index[8])
+    spy = mocker.spy(sa, "Table")
+    module.RDSAdapter(url).query("USDJPY", df.index[1], df.index[8])
+    assert spy.call_count == 0
@@ -0,0 +1,21 @@
+from backlight.query import adapter as module
+import pandas as pd
+
+
+class DataFrameAdapter(module.DataSourceAdapter):
+    def __init__(self, df):
+        self._df = df
+
+    def query(self, symbol, start_dt, end_dt):
+        return self._df[start_dt:end_dt]
+
+
+def test_DataSourceAdapter_iter_query():
+    df = pd.DataFrame(
+        index=pd.date_range(start="2018-06-06", freq="1min", periods=10),
+        data={"ask": range(10), "bid": range(10)},
+    )
+    m = DataFrameAdapter(df)
+    chunks = list(m.iter_query("ABC", df.index[1], df.index[8], 3))
+    assert [len(c) for c in chunks] == [3, 3, 2]
+    pd.testing.assert_frame_equal(pd.concat(chunks), df.iloc[1:9])
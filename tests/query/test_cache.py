@@ -0,0 +1,142 @@
+from backlight.query import cache as module
+import numpy as np
+import pandas as pd
+import pytest
+
+import backlight.query
+
+
+@pytest.fixture
+def df():
+    df = pd.DataFrame(
+        index=pd.date_range(start="2018-06-06", freq="1min", periods=10),
+        data={"ask": np.arange(10) + 1.0, "bid": np.arange(10)},
+        columns=["ask", "bid"],
+    )
+    df.index.freq = None  # not stored in the cache
+    return df
+
+
+@pytest.fixture
+def cache(tmpdir):
+    return module.QueryCache(str(tmpdir.join("cache")))
+
+
+def test_cache_get(cache, df):
+    url = "file:///hoge.csv"
+    start_dt, end_dt = df.index[0], df.index[-1]
+    assert cache.get(url, "USDJPY", start_dt, end_dt) is None
+
+    cache.put(url, "USDJPY", start_dt, end_dt, df)
+    pd.testing.assert_frame_equal(cache.get(url, "USDJPY", start_dt, end_dt), df)
+    pd.testing.assert_frame_equal(
+        cache.get(url, "USDJPY", df.index[2], df.index[4]), df.iloc[2:5]
+    )
+
+    assert cache.get(url, "EURJPY", start_dt, end_dt) is None
+    assert cache.get("file:///huga.csv", "USDJPY", start_dt, end_dt) is None
+    assert cache.get(url, "USDJPY", start_dt, end_dt + pd.Timedelta("1s")) is None
+
+
+def test_cache_eviction(tmpdir, df):
+    cache = module.QueryCache(
+        str(tmpdir.join("cache")), max_bytes=2000
+    )  # about two entries
+    start_dt, end_dt = df.index[0], df.index[-1]
+    for url in ["file:///a.csv", "file:///b.csv", "file:///c.csv"]:
+        cache.put(url, "USDJPY", start_dt, end_dt, df)
+        cache.get("file:///a.csv", "USDJPY", start_dt, end_dt)
+
+    assert cache.get("file:///a.csv", "USDJPY", start_dt, end_dt) is not None
+    assert cache.get("file:///b.csv", "USDJPY", start_dt, end_dt) is None
+    assert cache.get("file:///c.csv", "USDJPY", start_dt, end_dt) is not None
+
+
+def test_query_with_cache(tmpdir, cache, df, mocker):
+    path = str(tmpdir.join("USDJPY.csv"))
+    df.to_csv(path)
+    url = "file://" + path
+    spy = mocker.spy(backlight.query.common, "adapter_factory")
+
+    backlight.query.set_default_cache(cache)
+    try:
+        expected = backlight.query.query("USDJPY", df.index[0], df.index[-1], url)
+        result = backlight.query.query("USDJPY", df.index[1], df.index[3], url)
+    finally:
+        backlight.query.set_default_cache(None)
+
+    assert spy.call_count == 1
+    pd.testing.assert_frame_equal(result, expected.iloc[1:4])
+
+
+def test_cache_tz(cache, df):
+    df = df.tz_localize("UTC").tz_convert("Asia/Tokyo")
+    df["time"] = df.index.tz_convert("America/New_York")
+    url = "file:///hoge.csv"
+    cache.put(url, "USDJPY", df.index[0], df.index[-1], df)
+    res = cache.get(url, "USDJPY", df.index[2], df.index[4])
+    pd.testing.assert_frame_equal(res, df.iloc[2:5])
+
+
+def test_cache_source_changed(tmpdir, cache, df):
+    path = tmpdir.join("USDJPY.csv")
+    path.write("timestamp,ask,bid\n")
+    url = "file://" + str(path)
+    cache.put(url, "USDJPY", df.index[0], df.index[-1], df)
+    assert cache.get(url, "USDJPY", df.index[0], df.index[-1]) is not None
+
+    path.write("timestamp,ask,bid\n2018-06-06,1.0,0.0\n")
+    assert cache.get(url, "USDJPY", df.index[0], df.index[-1]) is None
+
+
+def test_cache_concurrent_writers(tmpdir, df, monkeypatch):
+    directory = tmpdir.join("cache")
+    caches = [module.QueryCache(str(directory)) for _ in range(2)]
+    start_dt, end_dt = df.index[0], df.index[-1]
+    caches[0].put("file:///a.csv", "USDJPY", start_dt, end_dt, df)
+    caches[1].put("file:///b.csv", "USDJPY", start_dt, end_dt, df)
+    for url in ["file:///a.csv", "file:///b.csv"]:
+        assert caches[0].get(url, "USDJPY", start_dt, end_dt) is not None
+
+    # a writer which died leaves its temporary directory, removed once stale
+    orphan = directory.join(module._TMP_DIR, "orphan").ensure(dir=True)
+    orphan.join("index.npy").write("x" * 100)
+    caches[0].put("file:///c.csv", "USDJPY", start_dt, end_dt, df)
+    assert orphan.check()
+    monkeypatch.setattr(module, "_STALE_SECONDS", -1)
+    caches[0].put("file:///d.csv", "USDJPY", start_dt, end_dt, df)
+    assert not orphan.check()
+
+
+def test_cache_tz_naive_query(cache, df):
+    url = "file:///hoge.csv"
+    aware = df.tz_localize("Asia/Tokyo")
+    cache.put(url, "USDJPY", aware.index[0], aware.index[-1], aware)
+    res = cache.get(url, "USDJPY", df.index[2], df.index[4])
+    pd.testing.assert_frame_equal(res, aware.iloc[2:5])
+
+    # aware queries are taken in UTC for a naive result
+    cache.put(url, "EURJPY", df.index[0], df.index[-1], df)
+    assert cache.get(url, "EURJPY", aware.index[2], aware.index[4]) is None
+    utc = df.tz_localize("UTC")
+    res = cache.get(url, "EURJPY", utc.index[2], utc.index[4])
+    pd.testing.assert_frame_equal(res, df.iloc[2:5])
+
+
+def test_cache_ttl(tmpdir, df, monkeypatch):
+    cache = module.QueryCache(str(tmpdir.join("cache")), ttl=60.0)
+    start_dt, end_dt = df.index[0], df.index[-1]
+    for url in ["file:///hoge.csv", "kdb://hoge:5000/t"]:
+        cache.put(url, "USDJPY", start_dt, end_dt, df)
+
+    now = module.time.time()
+    monkeypatch.setattr(module.time, "time", lambda: now + 30.0)
+    assert cache.get("kdb://hoge:5000/t", "USDJPY", start_dt, end_dt) is not None
+    monkeypatch.setattr(module.time, "time", lambda: now + 90.0)
+    assert cache.get("kdb://hoge:5000/t", "USDJPY", start_dt, end_dt) is None
+    assert cache.get("file:///hoge.csv", "USDJPY", start_dt, end_dt) is not None
+
+    cache = module.QueryCache(str(tmpdir.join("cache")), ttl=None)
+    cache.put("kdb://hoge:5000/t", "USDJPY", start_dt, end_dt, df)
+    monkeypatch.setattr(module.time, "time", lambda: now + 10 ** 6)
+    assert cache.get("kdb://hoge:5000/t", "USDJPY", start_dt, end_dt) is not None
@@ -0,0 +1,27 @@
+from backlight.query import loader as module
+import time
+import pytest
+
+
+def _load(seconds):
+    time.sleep(seconds)
+    return seconds * 10
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_load_files(max_workers):
+    items = [0.03, 0.01, 0.02, 0.0]
+    results, timings = module.load_files(_load, items, max_workers=max_workers)
+    assert results == [0.3, 0.1, 0.2, 0.0]
+    assert [t.name for t in timings] == ["0.03", "0.01", "0.02", "0.0"]
+    assert timings[0].seconds >= 0.03
+
+
+def test_load_files_with_processes():
+    results, _ = module.load_files(_load, [0.0, 0.01], use_processes=True)
+    assert results == [0.0, 0.1]
+
+
+def test_load_files_error():
+    with pytest.raises(ZeroDivisionError):
+        module.load_files(lambda x: 1 / x, [1, 0], max_workers=2)
@@ -1,9 +1,14 @@
 from backlight.query import common as module
+import inspect
+import pytest
 
 from backlight.query.adapters.csv import CSVAdapter, S3CSVAdapter
+from backlight.query.adapters.csv_glob import CSVGlobAdapter, S3CSVGlobAdapter
+from backlight.query.adapters.h5 import H5Adapter
 from backlight.query.adapters.kdb import KDBAdapter
 from backlight.query.adapters.mktsdb import MarketstoreAdapter
 from backlight.query.adapters.merge import MergeAdapter
+from backlight.query.adapters.parquet import ParquetAdapter
 from backlight.query.adapters.rds import RDSAdapter
 
 
@@ -16,11 +21,15 @@ def test_adapter_factory():
     adapter = module.adapter_factory(url)
     assert isinstance(adapter, CSVAdapter)
 
+    url = "file://hoge.parquet"
+    adapter = module.adapter_factory(url)
+    assert isinstance(adapter, ParquetAdapter)
+
     url = "s3://hoge.csv"
     adapter = module.adapter_factory(url)
     assert isinstance(adapter, S3CSVAdapter)
 
-    url = "kdb://hoge.csv"
+    url = "kdb://hoge:5000/t"
     adapter = module.adapter_factory(url)
     assert isinstance(adapter, KDBAdapter)
 
@@ -31,3 +40,46 @@ def test_adapter_factory():
     url = "rds://hoge.csv"
     adapter = module.adapter_factory(url)
     assert isinstance(adapter, RDSAdapter)
+
+
+def test_adapter_factory_kwargs():
+    url = "file://hoge.parquet"
+    adapter = module.adapter_factory(url, columns=["ask"], max_workers=2)
+    assert adapter._columns == ["ask"]
+
+    for url in ["file://hoge.csv", "s3://hoge.csv", "kdb://hoge:5000/t"]:
+        module.adapter_factory(url, columns=["ask"])
+
+    url = ["file://hoge.parquet", "s3://hoge.csv"]
+    adapter = module.adapter_factory(url, columns=["ask"], max_workers=2)
+    assert adapter._max_workers == 2
+    assert adapter._kwargs == {"columns": ["ask"]}
+
+
+def test_adapter_factory_unknown_kwargs():
+    with pytest.raises(TypeError):
+        module.adapter_factory("file://hoge.csv", colums=["ask"])
+    with pytest.raises(TypeError):
+        module.adapter_factory(["file://hoge.csv"], max_worker=2)
+
+
+def test_adapter_kwargs():
+    adapters = [
+        CSVAdapter,
+        CSVGlobAdapter,
+        H5Adapter,
+        KDBAdapter,
+        MarketstoreAdapter,
+        MergeAdapter,
+        ParquetAdapter,
+        RDSAdapter,
+        S3CSVAdapter,
+        S3CSVGlobAdapter,
+    ]
+    kwargs = {
+        name
+        for adapter in adapters
+        for name, p in inspect.signature(adapter).parameters.items()
+        if p.kind == p.POSITIONAL_OR_KEYWORD and name not in ("url", "urls")
+    }
+    assert kwargs == module._ADAPTER_KWARGS
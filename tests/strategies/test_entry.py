@@ -96,3 +96,13 @@ def test_direction_based_entry(market, signal):
         name="amount",
     )
     assert (trades.amount == expected).all()
+
+
+def test_direction_based_entry_without_actions(market, signal):
+    direction_action_dict = {
+        TernaryDirection.UP: Action.Donothing,
+        TernaryDirection.DOWN: Action.Donothing,
+    }
+    trades = module.direction_based_entry(market, signal, direction_action_dict)
+    assert len(trades) == 0
+    assert trades.ids == []
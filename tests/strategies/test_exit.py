@@ -267,3 +267,151 @@ def test_exit_at_loss_and_gain(
         index=trades.amount.index, data=expected_data, columns=["amount"]
     )
     assert (trades.amount == expected.amount).all()
+
+
+def test_exit_with_vectorized_condition(market, signal, entries):
+    max_holding_time = pd.Timedelta("3min")
+
+    def _exit_condition(df, trade):
+        return df.mid >= 10.0
+
+    @module.vectorized_exit_condition
+    def _vectorized_exit_condition(df, starts, amounts, positions):
+        return df.mid.values[positions] >= 10.0
+
+    expected = module.exit_by_max_holding_time(
+        market, signal, entries, max_holding_time, _exit_condition
+    )
+    trades = module.exit_by_max_holding_time(
+        market, signal, entries, max_holding_time, _vectorized_exit_condition
+    )
+    pd.testing.assert_frame_equal(trades, expected)
+
+    expected = module.exit(market, None, entries, _exit_condition)
+    trades = module.exit(market, None, entries, _vectorized_exit_condition)
+    pd.testing.assert_frame_equal(trades, expected)
+    for i in trades.ids:
+        trade = trades.get_trade(i)
+        assert trade.index[-1] == max(trade.index[0], market.index[10])
+
+
+def test_exit_by_stops(symbol, currency_unit):
+    data = [[1.0], [2.0], [3.0], [4.0], [5.0], [4.0], [3.0], [2.0]]
+    market = backlight.datasource.from_dataframe(
+        pd.DataFrame(
+            index=pd.date_range(start="2018-06-06", freq="1min", periods=len(data)),
+            data=data,
+            columns=["mid"],
+        ),
+        symbol,
+        currency_unit,
+    )
+    entries = make_trades(
+        symbol,
+        (
+            make_trade([Transaction(pd.Timestamp("2018-06-06 00:00:00"), 1.0)]),
+            make_trade([Transaction(pd.Timestamp("2018-06-06 00:02:00"), 1.0)]),
+            make_trade([Transaction(pd.Timestamp("2018-06-06 00:03:00"), -1.0)]),
+        ),
+        currency_unit,
+    )
+
+    trades = module.exit_by_stops(
+        market,
+        entries,
+        max_holding_time=pd.Timedelta("3min"),
+        loss_threshold=3.0,
+        trailing_stop=1.0,
+    )
+    expected = make_trades(
+        symbol,
+        (
+            make_trade(
+                [
+                    Transaction(pd.Timestamp("2018-06-06 00:00:00"), 1.0),
+                    Transaction(pd.Timestamp("2018-06-06 00:03:00"), -1.0),  # max
+                ]
+            ),
+            make_trade(
+                [
+                    Transaction(pd.Timestamp("2018-06-06 00:02:00"), 1.0),
+                    Transaction(pd.Timestamp("2018-06-06 00:05:00"), -1.0),  # trail
+                ]
+            ),
+            make_trade(
+                [
+                    Transaction(pd.Timestamp("2018-06-06 00:03:00"), -1.0),
+                    Transaction(pd.Timestamp("2018-06-06 00:06:00"), 1.0),  # max
+                ]
+            ),
+        ),
+        currency_unit,
+    )
+    pd.testing.assert_frame_equal(trades, expected)
+
+
+def _record_scan_sizes(monkeypatch):
+    sizes = []
+    scan_first_true = module._scan_first_true
+
+    def _scan(evaluate, starts, ends):
+        def _evaluate(pending, positions):
+            sizes.append(positions.size)
+            return evaluate(pending, positions)
+
+        return scan_first_true(_evaluate, starts, ends)
+
+    monkeypatch.setattr(module, "_scan_first_true", _scan)
+    return sizes
+
+
+def _long_lived_entries(symbol, currency_unit, n_bars, n_entries):
+    market = backlight.datasource.from_dataframe(
+        pd.DataFrame(
+            index=pd.date_range(start="2018-06-06", freq="1min", periods=n_bars),
+            data=np.linspace(1.0, 2.0, n_bars),
+            columns=["mid"],
+        ),
+        symbol,
+        currency_unit,
+    )
+    entries = make_trades(
+        symbol,
+        [make_trade([Transaction(market.index[i], 1.0)]) for i in range(n_entries)],
+        currency_unit,
+    )
+    return market, entries
+
+
+def test_exit_by_trailing_stop_bounds_scan(monkeypatch, symbol, currency_unit):
+    market, entries = _long_lived_entries(symbol, currency_unit, 20000, 100)
+
+    expected = module.exit_by_trailing_stop(market, entries, 1.0, 1.0)
+
+    monkeypatch.setattr(module, "_MAX_SCAN_CELLS", 4096)
+    sizes = _record_scan_sizes(monkeypatch)
+    trades = module.exit_by_trailing_stop(market, entries, 1.0, 1.0)
+
+    pd.testing.assert_frame_equal(trades, expected)
+    assert max(sizes) <= 4096
+    for i in trades.ids:
+        assert trades.get_trade(i).index[-1] == market.index[-1]
+
+
+def test_exit_bounds_scan(monkeypatch, symbol, currency_unit):
+    market, entries = _long_lived_entries(symbol, currency_unit, 20000, 100)
+
+    @module.vectorized_exit_condition
+    def _exit_condition(df, starts, amounts, positions):
+        return df.mid.values[positions] > 2.0
+
+    expected = module.exit(market, None, entries, _exit_condition)
+
+    monkeypatch.setattr(module, "_MAX_SCAN_CELLS", 4096)
+    sizes = _record_scan_sizes(monkeypatch)
+    trades = module.exit(market, None, entries, _exit_condition)
+
+    pd.testing.assert_frame_equal(trades, expected)
+    assert max(sizes) <= 4096
+    for i in trades.ids:
+        assert trades.get_trade(i).index[-1] == market.index[-1]
@@ -119,6 +119,22 @@ def test_limit_max_amount(market, trades):
     assert (limited.amount == expected.amount[expected.exist]).all()
 
 
+def test_limit_max_amount_with_random_trades(symbol, currency_unit):
+    np.random.seed(0)
+    periods = 300
+    trades = backlight.trades.trades.from_arrays(
+        pd.date_range(start="2018-06-06", freq="1min", periods=periods),
+        np.random.choice([-2.0, -1.0, 0.5, 1.0, 2.0], periods),
+        np.random.randint(0, periods // 3, periods),
+        symbol,
+        currency_unit,
+    )
+    for max_amount in [1.0, 2.5, 4.0, 100.0]:
+        expected = module._limit_max_amount_by_iterrows(trades, max_amount)
+        limited = module.limit_max_amount(trades, max_amount)
+        pd.testing.assert_frame_equal(limited, expected)
+
+
 def test_skip_entry_by_spread(trades, askbid):
     spread = 2.0
     limited = module.skip_entry_by_spread(trades, askbid, spread)
@@ -153,6 +169,13 @@ def test_skip_entry_by_spread(trades, askbid):
     assert (limited.amount == expected.amount[expected.exist]).all()
 
 
+def test_skip_entry_by_spread_missing_timestamps(trades, askbid, monkeypatch):
+    # as when the assertions are disabled
+    monkeypatch.setattr(module, "is_contained", lambda a, b: True)
+    with pytest.raises(KeyError):
+        module.skip_entry_by_spread(trades, askbid.iloc[2:], 2.0)
+
+
 def test_filter_entry_by_time(trades, symbol, currency_unit):
     result = module.filter_entry_by_time(trades, "minute", [1, 3, 8, 12])
     df = pd.DataFrame(
@@ -193,6 +216,20 @@ def test_filter_entry_by_time(trades, symbol, currency_unit):
     assert (result.all() == expected.all()).all()
 
 
+def test_filter_entry_by_time_with_multiple_transactions(symbol, currency_unit):
+    index = pd.date_range(start="2018-06-06", freq="1min", periods=6)
+    trades = backlight.trades.trades.from_arrays(
+        index,
+        [1.0, 1.0, -1.0, -1.0, -1.0, 1.0],
+        [0, 1, 1, 0, 1, 1],
+        symbol,
+        currency_unit,
+    )
+    result = module.filter_entry_by_time(trades, "minute", [4])
+    assert result.ids == [1]
+    assert (result.index == index[[1, 2, 4, 5]]).all()
+
+
 @pytest.fixture
 def hourly_trades(symbol, currency_unit):
     data = [
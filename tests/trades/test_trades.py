@@ -53,6 +53,12 @@ def test_trades_get_any(trades):
     result = trades.get_any(trades.index.minute.isin([0, 4, 5]))
     pd.testing.assert_series_equal(result.amount, expected)
 
+    result = trades.get_any(trades["amount"].isin([-2.0, -4.0]).values)
+    pd.testing.assert_series_equal(result.amount, expected)
+
+    result = trades.get_any(trades["amount"] < -3.0)
+    pd.testing.assert_series_equal(result.amount, expected[2:])
+
 
 def test_trades_get_all(trades):
     data = [-4.0, 2.0]
@@ -69,6 +75,65 @@ def test_trades_get_trade(trades):
     pd.testing.assert_series_equal(trades.get_trade(0), expected)
 
 
+def test_trades_get_trade_without_id(trades):
+    expected = pd.Series(
+        data=[], index=pd.DatetimeIndex([]), name="amount", dtype=float
+    )
+    pd.testing.assert_series_equal(trades.get_trade(5), expected)
+
+
+def test_trades_iter_trades(trades):
+    ids = []
+    for i, trade in trades.iter_trades():
+        ids.append(i)
+        pd.testing.assert_series_equal(trade, trades.get_trade(i))
+    assert ids == trades.ids
+
+
+def test_trades_entries(trades):
+    index = pd.date_range(start="2018-06-06", freq="2min", periods=5)
+    expected = pd.DataFrame(
+        data={"timestamp": index, "amount": [1.0, 1.0, -4.0, 1.0, 1.0]},
+        index=pd.Index([0, 1, 2, 3, 4], name="_id"),
+        columns=["timestamp", "amount"],
+    )
+    pd.testing.assert_frame_equal(trades.entries, expected)
+
+
+def test_trades_index_invalidation(trades):
+    assert trades.ids == [0, 1, 2, 3, 4]
+    trades.loc[:, "_id"] = trades["_id"] + 1
+    assert trades.ids == [1, 2, 3, 4, 5]
+    trades["_id"] -= 1
+    assert trades.ids == [0, 1, 2, 3, 4]
+
+    trades.drop(trades.index[0:2], inplace=True)
+    assert trades.ids == [1, 2, 3, 4]
+    assert trades.get_trade(0).empty
+
+
+def test_trades_index_invalidation_by_series_writes(trades):
+    assert trades.ids == [0, 1, 2, 3, 4]
+    ids = trades["_id"]
+    ids[trades.index[0]] = 5
+    assert trades.ids == [5, 0, 1, 2, 3, 4]
+    assert trades.get_trade(5).tolist() == [1.0]
+
+    ids.where(ids != 4, 3, inplace=True)
+    assert trades.ids == [5, 0, 1, 2, 3]
+    assert trades.get_trade(3).tolist() == [1.0, 0.0, 1.0, 0.0]
+
+
+def test_trades_index_invalidation_by_frame_writes(trades):
+    assert trades.ids == [0, 1, 2, 3, 4]
+    trades.at[trades.index[0], "_id"] = 5
+    assert trades.ids == [5, 0, 1, 2, 3, 4]
+    trades.iloc[0, trades.columns.get_loc("_id")] = 6
+    assert trades.ids == [6, 0, 1, 2, 3, 4]
+    trades.sort_values("_id", ascending=False, inplace=True)
+    assert trades.ids == [6, 4, 3, 2, 1, 0]
+
+
 def test_make_trade():
     periods = 2
     dates = pd.date_range(start="2018-12-01", periods=periods)
@@ -95,6 +160,34 @@ def test_make_trade():
     pd.testing.assert_series_equal(trade, expected)
 
 
+def test_from_arrays(symbol, currency_unit):
+    index = pd.DatetimeIndex(
+        [
+            pd.Timestamp("2018-06-06 00:01:00"),
+            pd.Timestamp("2018-06-06 00:00:00"),
+            pd.Timestamp("2018-06-06 00:01:00"),
+        ]
+    )
+    result = module.from_arrays(
+        index, [-1.0, 1.0, 2.0], [1, 1, 0], symbol, currency_unit
+    )
+    expected = pd.DataFrame(
+        index=index[[1, 2, 0]],
+        data=[[1.0, 1], [2.0, 0], [-1.0, 1]],
+        columns=["amount", "_id"],
+    )
+    assert result.symbol == symbol
+    assert result.currency_unit == currency_unit
+    assert result.ids == [1, 0]
+    pd.testing.assert_frame_equal(result, module.Trades(expected))
+
+
+def test_make_trades_without_trades(symbol, currency_unit):
+    trades = module.make_trades(symbol, [], currency_unit)
+    assert len(trades) == 0
+    assert trades.ids == []
+
+
 @pytest.mark.parametrize(
     "expected_ids, refresh_id",
     [[[0, 1, 2, 3, 4], False], [[0, 5, 1, 6, 2, 7, 3, 8, 4, 9], True]],